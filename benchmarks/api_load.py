@@ -0,0 +1,283 @@
+"""Latency and throughput of every author, book and borrow route.
+
+Starts the FastAPI app in-process (requests go straight to the ASGI callable,
+no sockets), seeds a throwaway database, then fires --requests requests at
+each route with --concurrency workers and reports p50/p95/p99 latency,
+throughput and status codes as JSON, one object per route, plus a contended
+borrow scenario where many readers race for the copies of one book:
+
+    PYTHONPATH=src python benchmarks/api_load.py --authors 1000 --output load.json
+
+Compare two runs with e.g. `jq -s '[.[0].results, .[1].results] | transpose'`.
+The schema relies on tsvector and pg_trgm, so Postgres is required; the
+tables are truncated.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from datetime import date
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.main import app
+
+
+async def request(method: str, url: str, body: Optional[object] = None) -> tuple[int, int]:
+    path, _, query = url.partition("?")
+    payload = b"" if body is None else json.dumps(body).encode()
+    headers = [(b"host", b"benchmark")]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("benchmark", 0),
+        "server": ("benchmark", 80),
+    }
+    received = False
+    response = {"status": 0, "size": 0}
+
+    async def receive() -> dict:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["size"] += len(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Starlette re-raises unhandled errors after sending the 500 response,
+        # like uvicorn, keep going and count the status.
+        pass
+    return response["status"], response["size"]
+
+
+async def fill(authors: int, books_per_author: int, spare: int) -> dict:
+    books = authors * books_per_author
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(
+            text(
+                "INSERT INTO author (name, surname, date_of_birth) "
+                "SELECT 'name' || g, 'surname' || g, DATE '1970-01-01' + g % 10000 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"count": authors + spare},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO book (title, description, author_id, available_copies) "
+                "SELECT 'title' || g, 'description of book ' || g, "
+                "CASE WHEN g <= :books THEN (g - 1) % :authors + 1 ELSE 1 END, 1000 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"books": books, "authors": authors, "count": books + spare},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO borrow (book_id, reader_name, borrow_date, is_return) "
+                "SELECT g, 'reader' || g % 1000, CURRENT_DATE - 30, false "
+                "FROM generate_series(1, :books) AS g"
+            ),
+            {"books": books},
+        )
+        await conn.execute(text("ANALYZE author, book, borrow"))
+    return {"authors": authors, "books": books, "borrows": books}
+
+
+def routes(seed: dict, spare: int, batch: int) -> list[tuple[str, Callable[[int], tuple]]]:
+    authors, books, borrows = seed["authors"], seed["books"], seed["borrows"]
+    today = date.today().isoformat()
+
+    def author_id(i: int) -> int:
+        return random.randint(1, authors)
+
+    def book_id(i: int) -> int:
+        return random.randint(1, books)
+
+    def borrow_id(i: int) -> int:
+        return random.randint(1, borrows)
+
+    return [
+        ("GET /authors", lambda i: ("GET", f"/api_library/authors/?after={author_id(i)}", None)),
+        ("GET /authors?include=books", lambda i: ("GET", f"/api_library/authors/?after={author_id(i)}&include=books", None)),
+        ("GET /authors/search", lambda i: ("GET", f"/api_library/authors/search?q=name{author_id(i) % 100}", None)),
+        ("GET /authors/{id}", lambda i: ("GET", f"/api_library/authors/{author_id(i)}", None)),
+        ("GET /authors/{id}?include=books", lambda i: ("GET", f"/api_library/authors/{author_id(i)}?include=books", None)),
+        ("GET /authors/{id}/books", lambda i: ("GET", f"/api_library/authors/{author_id(i)}/books", None)),
+        ("GET /books", lambda i: ("GET", f"/api_library/books/?after={book_id(i)}", None)),
+        ("GET /books?include=borrows", lambda i: ("GET", f"/api_library/books/?after={book_id(i)}&include=borrows", None)),
+        ("GET /books/search", lambda i: ("GET", f"/api_library/books/search?q=title{book_id(i) % 100}", None)),
+        ("GET /books/{id}", lambda i: ("GET", f"/api_library/books/{book_id(i)}", None)),
+        ("GET /books/{id}?include=borrows", lambda i: ("GET", f"/api_library/books/{book_id(i)}?include=borrows", None)),
+        ("GET /books/{id}/borrows", lambda i: ("GET", f"/api_library/books/{book_id(i)}/borrows", None)),
+        ("GET /borrows", lambda i: ("GET", f"/api_library/borrows/?after={borrow_id(i)}", None)),
+        ("GET /borrows?book_id", lambda i: ("GET", f"/api_library/borrows/?book_id={book_id(i)}", None)),
+        ("GET /borrows?reader_name&is_return", lambda i: ("GET", f"/api_library/borrows/?reader_name=reader{i % 1000}&is_return=false", None)),
+        ("GET /borrows/{id}", lambda i: ("GET", f"/api_library/borrows/{borrow_id(i)}", None)),
+        ("GET /stats/books/most-borrowed", lambda i: ("GET", "/api_library/stats/books/most-borrowed", None)),
+        ("GET /stats/authors/active-borrows", lambda i: ("GET", "/api_library/stats/authors/active-borrows", None)),
+        ("GET /stats/borrows", lambda i: ("GET", "/api_library/stats/borrows", None)),
+        ("POST /authors", lambda i: ("POST", f"/api_library/authors/?name=new{i}&surname=author&date_of_birth=1980-01-01", None)),
+        ("POST /authors/batch", lambda i: ("POST", "/api_library/authors/batch", [{"name": f"new{i}", "surname": "author"}] * batch)),
+        ("PUT /authors/{id}", lambda i: ("PUT", f"/api_library/authors/{author_id(i)}?name=renamed&surname=author&date_of_birth=1980-01-01", None)),
+        ("PATCH /authors/{id}", lambda i: ("PATCH", f"/api_library/authors/{author_id(i)}", {"surname": f"patched{i}"})),
+        ("POST /books", lambda i: ("POST", f"/api_library/books/?title=new{i}&description=book&author_id={author_id(i)}&available_copies=5", None)),
+        ("POST /books/batch", lambda i: ("POST", "/api_library/books/batch", [{"title": f"new{i}", "author_id": author_id(i), "available_copies": 5}] * batch)),
+        ("PUT /books/{id}", lambda i: ("PUT", f"/api_library/books/{book_id(i)}?title=renamed&description=book&author_id={author_id(i)}&available_copies=1000", None)),
+        ("PATCH /books/{id}", lambda i: ("PATCH", f"/api_library/books/{book_id(i)}", {"title": f"patched{i}"})),
+        ("POST /borrows", lambda i: ("POST", f"/api_library/borrows/?book_id={book_id(i)}&reader_name=reader{i}&borrow_date={today}", None)),
+        ("POST /borrows/batch", lambda i: ("POST", "/api_library/borrows/batch", {"book_ids": [book_id(i) for _ in range(batch)], "reader_name": f"reader{i}", "borrow_date": today})),
+        ("PATCH /borrows/{id}/response", lambda i: ("PATCH", f"/api_library/borrows/{i + 1}/response?return_date={today}", None)),
+        ("PATCH /borrows/return", lambda i: ("PATCH", "/api_library/borrows/return", {"borrow_ids": list(range(spare + i * batch + 1, spare + (i + 1) * batch + 1)), "return_date": today})),
+        ("DELETE /books/{id}", lambda i: ("DELETE", f"/api_library/books/{books + i + 1}", None)),
+        ("DELETE /authors/{id}", lambda i: ("DELETE", f"/api_library/authors/{authors + i + 1}", None)),
+        ("GET /authors/export", lambda i: ("GET", "/api_library/authors/export", None)),
+        ("GET /books/export", lambda i: ("GET", "/api_library/books/export", None)),
+        ("GET /borrows/export", lambda i: ("GET", "/api_library/borrows/export", None)),
+    ]
+
+
+async def run(name: str, make: Callable[[int], tuple], requests: int, concurrency: int) -> dict:
+    latencies, statuses = [], {}
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for i in counter:
+            method, url, body = make(i)
+            started = time.perf_counter()
+            status, _ = await request(method, url, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summary(name, latencies, statuses, elapsed)
+
+
+def summary(name: str, latencies: list[float], statuses: dict, elapsed: float) -> dict:
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "route": name,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+async def contended_borrow(requests: int, concurrency: int, copies: int) -> dict:
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text(
+                "INSERT INTO book (title, author_id, available_copies) "
+                "VALUES ('contended', 1, :copies) RETURNING id"
+            ),
+            {"copies": copies},
+        )
+        book_id = result.scalar()
+
+    today = date.today().isoformat()
+    result = await run(
+        "POST /borrows (contended)",
+        lambda i: ("POST", f"/api_library/borrows/?book_id={book_id}&reader_name=reader{i}&borrow_date={today}", None),
+        requests,
+        concurrency,
+    )
+
+    async with engine.connect() as conn:
+        remaining = await conn.execute(
+            text("SELECT available_copies FROM book WHERE id = :id"), {"id": book_id}
+        )
+        result["copies"] = copies
+        result["copies_left"] = remaining.scalar()
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--books-per-author", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--export-requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--contended-requests", type=int, default=500)
+    parser.add_argument("--contended-copies", type=int, default=200)
+    parser.add_argument("--route", action="append", help="run only routes containing this text")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    spare = args.requests
+    if args.authors * args.books_per_author < spare * (args.batch + 1):
+        parser.error("not enough borrows to return, raise --authors or lower --requests")
+
+    seed = await fill(args.authors, args.books_per_author, spare)
+    report = {
+        "commit": git_commit(),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "data": seed,
+        "results": [],
+    }
+
+    async with app.router.lifespan_context(app):
+        for name, make in routes(seed, spare, args.batch):
+            if args.route and not any(part in name for part in args.route):
+                continue
+            requests = args.export_requests if name.endswith("/export") else args.requests
+            concurrency = min(args.concurrency, requests)
+            report["results"].append(await run(name, make, requests, concurrency))
+            print(json.dumps(report["results"][-1]), flush=True)
+
+        if not args.route or any(part in "POST /borrows (contended)" for part in args.route):
+            report["results"].append(
+                await contended_borrow(
+                    args.contended_requests, args.concurrency * 5, args.contended_copies
+                )
+            )
+            print(json.dumps(report["results"][-1]), flush=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Rows per second of create_author / create_book vs create_authors / create_books.
+
+Run against a throwaway database, the tables are truncated:
+
+    PYTHONPATH=src python benchmarks/batch_insert.py --rows 10000 --batch-sizes 100 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from app.crud.author import create_author, create_authors
+from app.crud.book import create_book, create_books
+from app.database import async_session, engine
+from app.schemes import AuthorCreateScheme, BookCreateScheme
+
+
+async def truncate() -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+
+
+async def single(rows: int) -> dict:
+    await truncate()
+    async with async_session() as db:
+        started = time.perf_counter()
+        for _ in range(rows):
+            await create_author("name", "surname", date(2000, 1, 1), db)
+        authors_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(rows):
+            await create_book("title", None, i + 1, 1, db)
+        books_elapsed = time.perf_counter() - started
+
+    return {
+        "mode": "single",
+        "rows": rows,
+        "authors_per_s": round(rows / authors_elapsed),
+        "books_per_s": round(rows / books_elapsed),
+    }
+
+
+async def batch(rows: int, batch_size: int) -> dict:
+    await truncate()
+    async with async_session() as db:
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            await create_authors(
+                [
+                    AuthorCreateScheme(name="name", surname="surname", date_of_birth=date(2000, 1, 1))
+                    for _ in range(min(batch_size, rows - offset))
+                ],
+                db,
+            )
+        authors_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            await create_books(
+                [
+                    BookCreateScheme(title="title", author_id=i + 1, available_copies=1)
+                    for i in range(offset, min(offset + batch_size, rows))
+                ],
+                db,
+            )
+        books_elapsed = time.perf_counter() - started
+
+    return {
+        "mode": "batch",
+        "batch_size": batch_size,
+        "rows": rows,
+        "authors_per_s": round(rows / authors_elapsed),
+        "books_per_s": round(rows / books_elapsed),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(json.dumps(await single(args.rows)), flush=True)
+    for batch_size in args.batch_sizes:
+        print(json.dumps(await batch(args.rows, batch_size)), flush=True)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
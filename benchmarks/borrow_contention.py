@@ -0,0 +1,104 @@
+"""Concurrent borrows of a single book: correctness and throughput.
+
+Fires --borrows simultaneous create_borrow calls at one book that has
+--copies copies and compares throughput with the previous read-modify-write
+implementation, reporting whether each run stayed consistent. The
+correctness guarantee itself is asserted by tests/test_borrow_concurrency.py:
+
+    PYTHONPATH=src python benchmarks/borrow_contention.py --borrows 500 --copies 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date
+
+from sqlalchemy import func, text
+from sqlalchemy.future import select
+
+from app.crud.borrow import create_borrow
+from app.database import async_session, engine
+from app.models import Book, Borrow
+
+
+async def legacy_create_borrow(book_id, reader_name, borrow_date, db):
+    try:
+        book = await db.execute(select(Book).filter(Book.id == book_id))
+        book = book.scalars().first()
+        if not book:
+            return None
+        if book.available_copies == 0:
+            return False
+
+        book.available_copies -= 1
+        new_borrow = Borrow(
+            book_id=book_id, reader_name=reader_name, borrow_date=borrow_date
+        )
+        db.add(new_borrow)
+        await db.commit()
+        await db.refresh(book)
+        await db.refresh(new_borrow)
+        return new_borrow
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def setup(copies: int) -> int:
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(text("INSERT INTO author (name, surname) VALUES ('name', 'surname')"))
+        result = await conn.execute(
+            text(
+                "INSERT INTO book (title, author_id, available_copies) "
+                "VALUES ('title', 1, :copies) RETURNING id"
+            ),
+            {"copies": copies},
+        )
+        return result.scalar()
+
+
+async def run(implementation, borrows: int, copies: int) -> dict:
+    book_id = await setup(copies)
+
+    async def borrow(reader: int):
+        async with async_session() as db:
+            return await implementation(book_id, f"reader{reader}", date.today(), db)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(borrow(i) for i in range(borrows)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    async with async_session() as db:
+        available = await db.scalar(select(Book.available_copies).filter(Book.id == book_id))
+        created = await db.scalar(select(func.count()).select_from(Borrow))
+
+    succeeded = sum(1 for result in results if result not in (None, False) and not isinstance(result, Exception))
+    return {
+        "implementation": implementation.__name__,
+        "borrows": borrows,
+        "copies": copies,
+        "succeeded": succeeded,
+        "errors": sum(1 for result in results if isinstance(result, Exception)),
+        "borrow_rows": created,
+        "available_copies": available,
+        "consistent": available >= 0 and created == succeeded == min(borrows, copies) and available == copies - created,
+        "seconds": round(elapsed, 3),
+        "borrows_per_second": round(borrows / elapsed, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--borrows", type=int, default=500)
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+
+    for implementation in (create_borrow, legacy_create_borrow):
+        print(json.dumps(await run(implementation, args.borrows, args.copies)), flush=True)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
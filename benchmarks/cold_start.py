@@ -0,0 +1,108 @@
+"""Time to the first fast request of a cold worker, with and without warm-up.
+
+Seeds a throwaway database, then starts a fresh Python process per variant
+(DB_WARMUP_CONNECTIONS=0 and the configured warm-up) with the entity cache
+disabled. Each process imports the app, runs the lifespan startup, sends a
+burst of --burst concurrent GET /books/{id} requests and then --requests
+sequential ones. A request counts as fast when it takes at most twice the
+median of the second half of the sequential requests:
+
+    PYTHONPATH=src python benchmarks/cold_start.py --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+
+def elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 3)
+
+
+async def cold_worker(requests: int, burst: int) -> dict:
+    from api_load import request
+    from app.main import app
+
+    imported = elapsed_ms(STARTED)
+    completed: list[tuple[float, float]] = []
+
+    async def get_book(id: int) -> None:
+        started = time.perf_counter()
+        status, _ = await request("GET", f"/api_library/books/{id}")
+        if status != 200:
+            raise RuntimeError(f"GET /books/{id} returned {status}")
+        completed.append((elapsed_ms(started), elapsed_ms(STARTED)))
+
+    async with app.router.lifespan_context(app):
+        ready = elapsed_ms(STARTED)
+        await asyncio.gather(*(get_book(id) for id in range(1, burst + 1)))
+        for id in range(burst + 1, burst + requests + 1):
+            await get_book(id)
+
+    latencies = [latency for latency, _ in completed]
+    steady = statistics.median(latencies[burst + requests // 2:])
+    first_fast = next(finished for latency, finished in completed if latency <= 2 * steady)
+    return {
+        "import_ms": imported,
+        "startup_ms": round(ready - imported, 3),
+        "first_request_ms": latencies[0],
+        "burst_max_ms": max(latencies[:burst]),
+        "steady_p50_ms": steady,
+        "time_to_first_fast_request_ms": first_fast,
+        "time_to_first_fast_after_ready_ms": round(first_fast - ready, 3),
+    }
+
+
+def run_worker(args: argparse.Namespace, warmup: bool) -> dict:
+    env = {**os.environ, "CACHE_ENABLED": "false", "STATS_REFRESH_SECONDS": "0"}
+    if not warmup:
+        env["DB_WARMUP_CONNECTIONS"] = "0"
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", "--requests", str(args.requests), "--burst", str(args.burst)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+async def seed(authors: int) -> None:
+    from api_load import fill
+    from app.database import engine
+
+    await fill(authors, 10, 0)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(cold_worker(args.requests, args.burst))))
+        return
+
+    asyncio.run(seed(args.authors))
+    for warmup in (False, True):
+        runs = [run_worker(args, warmup) for _ in range(args.runs)]
+        print(json.dumps({
+            "warmup": warmup,
+            "runs": args.runs,
+            **{key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]},
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Throughput of the COPY based CSV export and import.
+
+Fills each table with --rows rows, exports them to temporary files, truncates
+the tables and imports the files back. Run against a throwaway database:
+
+    PYTHONPATH=src python benchmarks/copy_transfer.py --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import resource
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from app.crud.transfer import copy_csv_to_table, copy_table_to_csv
+from app.database import async_session, engine
+
+TABLES = ("author", "book", "borrow")
+
+
+async def fill(rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(
+            text(
+                "INSERT INTO author (name, surname, date_of_birth) "
+                "SELECT 'name' || g, 'surname', DATE '2000-01-01' FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": rows},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO book (title, description, author_id, available_copies) "
+                "SELECT 'title' || g, 'description', g, 10 FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": rows},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO borrow (book_id, reader_name, borrow_date, is_return) "
+                "SELECT g, 'reader' || g % 1000, CURRENT_DATE, false FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": rows},
+        )
+
+
+async def read_file(path: str, chunk_size: int = 65536):
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def max_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    await fill(args.rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in TABLES:
+            written = 0
+            started = time.perf_counter()
+            async with async_session() as db:
+                with open(f"{directory}/{name}.csv", "wb") as file:
+                    async for chunk in copy_table_to_csv(name, db):
+                        written += file.write(chunk)
+            elapsed = time.perf_counter() - started
+            print(json.dumps({
+                "op": "export",
+                "table": name,
+                "rows": args.rows,
+                "mb": round(written / 2**20, 1),
+                "rows_per_min": round(args.rows / elapsed * 60),
+                "max_rss_mb": max_rss_mb(),
+            }), flush=True)
+
+        async with engine.begin() as conn:
+            await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+
+        for name in TABLES:
+            started = time.perf_counter()
+            async with async_session() as db:
+                rows = await copy_csv_to_table(name, read_file(f"{directory}/{name}.csv"), db)
+            elapsed = time.perf_counter() - started
+            print(json.dumps({
+                "op": "import",
+                "table": name,
+                "rows": rows,
+                "rows_per_min": round(args.rows / elapsed * 60),
+                "max_rss_mb": max_rss_mb(),
+            }), flush=True)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Insert latency of create_author / create_book / create_borrow vs table size.
+
+Run against a throwaway database, the tables are truncated:
+
+    PYTHONPATH=src python benchmarks/insert_latency.py --sizes 1000 100000 10000000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from app.crud.author import create_author
+from app.crud.book import create_book
+from app.crud.borrow import create_borrow
+from app.database import async_session, engine
+
+
+async def fill(size: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(
+            text(
+                "INSERT INTO author (name, surname) "
+                "SELECT 'name', 'surname' FROM generate_series(1, :size)"
+            ),
+            {"size": size},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO book (title, author_id, available_copies) "
+                "SELECT 'title', g, 1000000 FROM generate_series(1, :size) AS g"
+            ),
+            {"size": size},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO borrow (book_id, reader_name, borrow_date, is_return) "
+                "SELECT g, 'reader', CURRENT_DATE, false FROM generate_series(1, :size) AS g"
+            ),
+            {"size": size},
+        )
+        await conn.execute(text("ANALYZE author, book, borrow"))
+
+
+def summary(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+async def measure(samples: int) -> dict:
+    timings = {"author": [], "book": [], "borrow": []}
+    async with async_session() as db:
+        for _ in range(samples):
+            started = time.perf_counter()
+            await create_author("name", "surname", date(2000, 1, 1), db)
+            timings["author"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await create_book("title", None, 1, 1000000, db)
+            timings["book"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await create_borrow(1, "reader", date.today(), db)
+            timings["borrow"].append(time.perf_counter() - started)
+
+    return {table: summary(values) for table, values in timings.items()}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000, 10000000])
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        await fill(size)
+        results.append({"rows": size, **await measure(args.samples)})
+        print(json.dumps(results[-1]), flush=True)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Latency of search_books / search_authors on a large catalog.
+
+Seeds --books books (and one author per 10 books) with pseudo-random words
+plus one of a few common words in every description, then times searches by
+random prefixes of 1 to 6 characters (below SEARCH_PREFIX_MIN_LENGTH they
+match whole words only) and by the common words, alone and combined with a
+prefix. Run against a throwaway database:
+
+    PYTHONPATH=src python benchmarks/search_latency.py --books 1000000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.config import SEARCH_PREFIX_MIN_LENGTH
+from app.crud.author import search_authors
+from app.crud.book import search_books
+from app.database import async_session, engine
+
+# Every book has one of these, so each matches a third of the catalog.
+COMMON_WORDS = ["the", "of", "and"]
+
+
+async def seed(books: int) -> None:
+    authors = max(books // 10, 1)
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(
+            text(
+                "INSERT INTO author (name, surname) "
+                "SELECT substr(md5(g::text), 1, 8), substr(md5((g * 7)::text), 1, 10) "
+                "FROM generate_series(1, :n) AS g"
+            ),
+            {"n": authors},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO book (title, description, author_id, available_copies) "
+                "SELECT substr(md5(g::text), 1, 6) || ' ' || substr(md5((g * 3)::text), 1, 6), "
+                "substr(md5((g * 5)::text), 1, 8) || ' ' || substr(md5((g * 11)::text), 1, 8) "
+                "|| ' ' || (CAST(:common AS text[]))[g % :common_count + 1], "
+                "(g % :authors) + 1, 1 FROM generate_series(1, :n) AS g"
+            ),
+            {"authors": authors, "n": books, "common": COMMON_WORDS, "common_count": len(COMMON_WORDS)},
+        )
+        await conn.execute(text("ANALYZE author, book"))
+
+
+def summary(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 3),
+    }
+
+
+async def measure(search, queries: list[str]) -> dict:
+    timings = []
+    async with async_session() as db:
+        for q in queries:
+            started = time.perf_counter()
+            await search(q, db, limit=20)
+            timings.append(time.perf_counter() - started)
+    return summary(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--skip-authors", action="store_true")
+    args = parser.parse_args()
+
+    await seed(args.books)
+    rng = random.Random(0)
+    hexdigits = "0123456789abcdef"
+    results = {"books": args.books, "prefix_min_length": SEARCH_PREFIX_MIN_LENGTH}
+    for prefix_length in (1, 2, 3, 4, 6):
+        queries = [
+            "".join(rng.choice(hexdigits) for _ in range(prefix_length))
+            for _ in range(args.queries)
+        ]
+        results[f"search_books_prefix_{prefix_length}"] = await measure(search_books, queries)
+        if not args.skip_authors:
+            results[f"search_authors_prefix_{prefix_length}"] = await measure(search_authors, queries)
+
+    common = [rng.choice(COMMON_WORDS) for _ in range(args.queries)]
+    results["search_books_common_word"] = await measure(search_books, common)
+    results["search_books_common_word_and_prefix_4"] = await measure(
+        search_books,
+        [f"{word} {''.join(rng.choice(hexdigits) for _ in range(4))}" for word in common],
+    )
+
+    print(json.dumps(results), flush=True)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
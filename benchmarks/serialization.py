@@ -0,0 +1,166 @@
+"""Cost of loading and serializing a 10k row page of books and borrows.
+
+Compares the old handler path (ORM entities, schemes built field by field,
+FastAPI response_model validation and json.dumps) with the current one (plain
+rows, model_validate, ModelJSONResponse). Run against a throwaway database,
+the tables are truncated:
+
+    PYTHONPATH=src python benchmarks/serialization.py --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import asc, select, text
+
+from app.crud.book import get_all_books
+from app.crud.borrow import get_all_borrows
+from app.database import async_session, engine
+from app.models import Book, Borrow
+from app.responses import ModelJSONResponse
+from app.schemes import BookPageScheme, BookScheme, BorrowPageScheme, BorrowScheme
+
+
+async def fill(rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(text("INSERT INTO author (name, surname) VALUES ('name', 'surname')"))
+        await conn.execute(
+            text(
+                "INSERT INTO book (title, description, author_id, available_copies) "
+                "SELECT 'title' || g, 'description ' || g, 1, 10 FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": rows},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO borrow (book_id, reader_name, borrow_date, is_return) "
+                "SELECT g, 'reader' || g, CURRENT_DATE, false FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": rows},
+        )
+        await conn.execute(text("ANALYZE author, book, borrow"))
+
+
+async def legacy_books(db, rows: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    result = await db.execute(select(Book).order_by(asc(Book.id)).limit(rows + 1))
+    books = result.scalars().all()[:rows]
+    loaded = time.perf_counter()
+
+    page = BookPageScheme(
+        items=[
+            BookScheme(
+                id=book.id,
+                title=book.title,
+                description=book.description,
+                author_id=book.author_id,
+                available_copies=book.available_copies,
+                version=book.version,
+            )
+            for book in books
+        ],
+        next_cursor=None,
+    )
+    content = await serialize_response(
+        field=create_model_field("response", BookPageScheme), response_content=page
+    )
+    JSONResponse(content)
+    return loaded - started, time.perf_counter() - loaded
+
+
+async def legacy_borrows(db, rows: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    result = await db.execute(select(Borrow).order_by(asc(Borrow.id)).limit(rows + 1))
+    borrows = result.scalars().all()[:rows]
+    loaded = time.perf_counter()
+
+    page = BorrowPageScheme(
+        items=[
+            BorrowScheme(
+                id=borrow.id,
+                book_id=borrow.book_id,
+                reader_name=borrow.reader_name,
+                borrow_date=borrow.borrow_date,
+                return_date=borrow.return_date,
+                is_return=borrow.is_return,
+                version=borrow.version,
+            )
+            for borrow in borrows
+        ],
+        next_cursor=None,
+    )
+    content = await serialize_response(
+        field=create_model_field("response", BorrowPageScheme), response_content=page
+    )
+    JSONResponse(content)
+    return loaded - started, time.perf_counter() - loaded
+
+
+async def current_books(db, rows: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    books, next_cursor = await get_all_books(db, limit=rows)
+    loaded = time.perf_counter()
+
+    ModelJSONResponse(
+        BookPageScheme.model_validate(
+            {"items": [book._mapping for book in books], "next_cursor": next_cursor}
+        )
+    )
+    return loaded - started, time.perf_counter() - loaded
+
+
+async def current_borrows(db, rows: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    borrows, next_cursor = await get_all_borrows(db, limit=rows)
+    loaded = time.perf_counter()
+
+    ModelJSONResponse(
+        BorrowPageScheme.model_validate(
+            {"items": [borrow._mapping for borrow in borrows], "next_cursor": next_cursor}
+        )
+    )
+    return loaded - started, time.perf_counter() - loaded
+
+
+async def measure(name: str, path, rows: int, repeat: int) -> dict:
+    load, serialize = [], []
+    for _ in range(repeat):
+        async with async_session() as db:
+            load_seconds, serialize_seconds = await path(db, rows)
+        load.append(load_seconds)
+        serialize.append(serialize_seconds)
+
+    return {
+        "path": name,
+        "rows": rows,
+        "load_ms": round(min(load) * 1000, 1),
+        "serialize_ms": round(min(serialize) * 1000, 1),
+        "total_ms": round(min(a + b for a, b in zip(load, serialize)) * 1000, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    await fill(args.rows)
+    for name, path in (
+        ("legacy_books", legacy_books),
+        ("books", current_books),
+        ("legacy_borrows", legacy_borrows),
+        ("borrows", current_borrows),
+    ):
+        print(json.dumps(await measure(name, path, args.rows, args.repeat)), flush=True)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
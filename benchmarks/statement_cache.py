@@ -0,0 +1,102 @@
+"""Per-call CPU cost of the by-id lookups with and without precompiled statements.
+
+Seeds a throwaway database, disables the entity cache and calls get_book and
+get_borrow --iterations times in one session for each variant:
+
+- rebuilt: the query is built per call (`select(Book).filter(Book.id == id)`),
+  as the CRUD layer used to do; SQLAlchemy's compiled cache still hits;
+- rebuilt_uncached: the same with the compiled cache bypassed, i.e. what
+  every call costs when the caches don't line up;
+- precompiled: the module-level statement used by app.crud now.
+
+Process CPU time (the database server is another process) and wall time per
+call are reported as JSON together with the compiled and prepared statement
+cache hit rates of each run:
+
+    PYTHONPATH=src python benchmarks/statement_cache.py --iterations 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from api_load import fill, git_commit
+
+from app.cache import NullCacheBackend, entity_cache
+from app.crud import book, borrow
+from app.database import async_session, engine, statement_cache_stats
+from app.models import Book, Borrow
+from app.schemes import BookScheme, BorrowScheme
+from sqlalchemy.future import select
+
+
+async def rebuilt(model, scheme, id, db, **options):
+    result = await db.execute(select(model).filter(model.id == id), execution_options=options)
+    row = result.scalars().first()
+    return scheme.model_validate(row)
+
+
+VARIANTS = {
+    "get_book": {
+        "rebuilt": lambda id, db: rebuilt(Book, BookScheme, id, db),
+        "rebuilt_uncached": lambda id, db: rebuilt(Book, BookScheme, id, db, compiled_cache=None),
+        "precompiled": book.get_book,
+    },
+    "get_borrow": {
+        "rebuilt": lambda id, db: rebuilt(Borrow, BorrowScheme, id, db),
+        "rebuilt_uncached": lambda id, db: rebuilt(Borrow, BorrowScheme, id, db, compiled_cache=None),
+        "precompiled": borrow.get_borrow,
+    },
+}
+
+
+async def measure(call, ids: list[int]) -> dict:
+    statement_cache_stats.compiled.clear()
+    statement_cache_stats.prepared.clear()
+    async with async_session() as db:
+        for id in ids[:100]:
+            await call(id, db)
+        statement_cache_stats.compiled.clear()
+        statement_cache_stats.prepared.clear()
+
+        cpu, wall = time.process_time(), time.perf_counter()
+        for id in ids:
+            await call(id, db)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    return {
+        "cpu_us_per_call": round(cpu / len(ids) * 1e6, 1),
+        "wall_us_per_call": round(wall / len(ids) * 1e6, 1),
+        **statement_cache_stats.as_dict(),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    entity_cache.backend = NullCacheBackend()
+    seed = await fill(args.authors, 10, 0)
+    ids = [random.randint(1, seed["books"]) for _ in range(args.iterations)]
+
+    results = []
+    for function, variants in VARIANTS.items():
+        for variant, call in variants.items():
+            result = await measure(call, ids)
+            results.append({"function": function, "variant": variant, **result})
+            print(json.dumps(results[-1]))
+
+    for function in VARIANTS:
+        by_variant = {result["variant"]: result for result in results if result["function"] == function}
+        saved = by_variant["rebuilt"]["cpu_us_per_call"] - by_variant["precompiled"]["cpu_us_per_call"]
+        print(json.dumps({"function": function, "cpu_us_saved_per_call": round(saved, 1), "commit": git_commit()}))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
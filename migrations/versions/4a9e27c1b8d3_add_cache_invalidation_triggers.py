@@ -0,0 +1,73 @@
+"""Add cache invalidation triggers
+
+Revision ID: 4a9e27c1b8d3
+Revises: d91c3f5a7e20
+Create Date: 2026-10-18 23:14:08.530172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a9e27c1b8d3'
+down_revision: Union[str, None] = 'd91c3f5a7e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One NOTIFY per statement with every changed id: it is queued inside the
+    # writing transaction and delivered by Postgres on commit, or dropped on
+    # rollback. The channel comes from the connection setting
+    # library.cache_channel; connections without it notify nobody. Payloads
+    # are limited to 8000 bytes, so a large statement drops the whole namespace.
+    op.execute(
+        """
+        CREATE FUNCTION notify_entity_cache() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            channel text := current_setting('library.cache_channel', true);
+            ids text;
+        BEGIN
+            IF coalesce(channel, '') = '' THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'DELETE' THEN
+                SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM old_rows;
+            ELSE
+                SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM new_rows;
+            END IF;
+
+            IF ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+            IF length(ids) > 7000 THEN
+                ids := '';
+            END IF;
+
+            PERFORM pg_notify(channel, TG_TABLE_NAME || ':' || ids);
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+
+    for table in ("author", "book", "borrow"):
+        op.execute(
+            f"CREATE TRIGGER {table}_cache_update AFTER UPDATE ON {table} "
+            f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_entity_cache()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_cache_delete AFTER DELETE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_entity_cache()"
+        )
+
+
+def downgrade() -> None:
+    for table in ("author", "book", "borrow"):
+        for operation in ("update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_cache_{operation} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_entity_cache()")
@@ -0,0 +1,34 @@
+"""Add secondary indexes
+
+Revision ID: a84e2d1c07f3
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 13:02:17.554190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a84e2d1c07f3'
+down_revision: Union[str, None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_book_author_id'), 'book', ['author_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_borrow_book_id'), 'borrow', ['book_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_borrow_reader_name'), 'borrow', ['reader_name'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_borrow_active_id', 'borrow', ['id'], unique=False, postgresql_where=sa.text('is_return = false'), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_borrow_active_id', table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_borrow_reader_name'), table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_borrow_book_id'), table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_book_author_id'), table_name='book', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,83 @@
+"""Add borrow stats materialized views
+
+Revision ID: b7d41e9a2c58
+Revises: f03a8c6e1d27
+Create Date: 2026-10-18 19:12:08.417305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41e9a2c58'
+down_revision: Union[str, None] = 'f03a8c6e1d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW book_borrow_stats AS
+        SELECT book_id,
+               count(*) AS borrow_count,
+               count(*) FILTER (WHERE NOT is_return) AS active_count
+        FROM borrow
+        GROUP BY book_id
+        """
+    )
+    op.create_index('ux_book_borrow_stats_book_id', 'book_borrow_stats', ['book_id'], unique=True)
+    op.create_index('ix_book_borrow_stats_borrow_count', 'book_borrow_stats', [sa.text('borrow_count DESC'), 'book_id'])
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW author_borrow_stats AS
+        SELECT book.author_id,
+               count(*) AS borrow_count,
+               count(*) FILTER (WHERE NOT borrow.is_return) AS active_count
+        FROM borrow
+        JOIN book ON book.id = borrow.book_id
+        GROUP BY book.author_id
+        """
+    )
+    op.create_index('ux_author_borrow_stats_author_id', 'author_borrow_stats', ['author_id'], unique=True)
+    op.create_index('ix_author_borrow_stats_active_count', 'author_borrow_stats', [sa.text('active_count DESC'), 'author_id'])
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW active_borrow_dates AS
+        SELECT borrow_date, return_date, count(*) AS active_count
+        FROM borrow
+        WHERE NOT is_return
+        GROUP BY borrow_date, return_date
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX ux_active_borrow_dates ON active_borrow_dates "
+        "(borrow_date, return_date) NULLS NOT DISTINCT"
+    )
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW borrow_summary AS
+        SELECT 1 AS id,
+               count(*) AS borrow_count,
+               count(*) FILTER (WHERE NOT is_return) AS active_count,
+               count(*) FILTER (WHERE is_return AND return_date IS NOT NULL) AS returned_count,
+               avg(return_date - borrow_date) FILTER (WHERE is_return AND return_date IS NOT NULL)
+                   AS average_loan_days,
+               now() AS refreshed_at
+        FROM borrow
+        """
+    )
+    op.create_index('ux_borrow_summary_id', 'borrow_summary', ['id'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS borrow_summary")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS active_borrow_dates")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS author_borrow_stats")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS book_borrow_stats")
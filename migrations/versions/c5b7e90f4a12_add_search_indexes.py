@@ -0,0 +1,36 @@
+"""Add search indexes
+
+Revision ID: c5b7e90f4a12
+Revises: a84e2d1c07f3
+Create Date: 2026-10-18 13:47:52.031846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5b7e90f4a12'
+down_revision: Union[str, None] = 'a84e2d1c07f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('book', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_search_vector', 'book', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_author_name_trgm', 'author', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_author_surname_trgm', 'author', ['surname'], unique=False, postgresql_using='gin', postgresql_ops={'surname': 'gin_trgm_ops'}, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_author_surname_trgm', table_name='author', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_author_name_trgm', table_name='author', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_book_search_vector', table_name='book', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('book', 'search_vector')
@@ -0,0 +1,72 @@
+"""Count borrows in the borrow statements
+
+Revision ID: c8e3a5f19d42
+Revises: 4a9e27c1b8d3
+Create Date: 2026-10-19 00:41:27.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e3a5f19d42'
+down_revision: Union[str, None] = '4a9e27c1b8d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_borrow(s) and finished_borrow(s) already update the book row to
+    # change available_copies and now change its counters in the same update;
+    # the borrow insert/update triggers updated the row a second time.
+    # /transfer/borrow applies its own deltas. Deletes (cascades, purges)
+    # keep their trigger.
+    op.execute("DROP TRIGGER borrow_counters_insert ON borrow")
+    op.execute("DROP TRIGGER borrow_counters_update ON borrow")
+
+    # The statement-level trigger ran for every book update, including each
+    # available_copies change; only a change of author moves a book between
+    # counters, and the WHEN clause is checked without calling the function.
+    op.execute("DROP TRIGGER book_counters_update ON book")
+    op.execute(
+        """
+        CREATE FUNCTION move_author_books_count() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM 1 FROM author WHERE id IN (OLD.author_id, NEW.author_id) ORDER BY id FOR NO KEY UPDATE;
+            UPDATE author
+            SET books_count = author.books_count + CASE WHEN author.id = NEW.author_id THEN 1 ELSE -1 END,
+                version = author.version + 1
+            WHERE author.id IN (OLD.author_id, NEW.author_id);
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER book_counters_update AFTER UPDATE OF author_id ON book "
+        "FOR EACH ROW WHEN (OLD.author_id IS DISTINCT FROM NEW.author_id) "
+        "EXECUTE FUNCTION move_author_books_count()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER book_counters_update ON book")
+    op.execute("DROP FUNCTION move_author_books_count()")
+
+    op.execute(
+        "CREATE TRIGGER book_counters_update AFTER UPDATE ON book "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION update_author_books_count()"
+    )
+    op.execute(
+        "CREATE TRIGGER borrow_counters_insert AFTER INSERT ON borrow "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION update_book_borrows_count()"
+    )
+    op.execute(
+        "CREATE TRIGGER borrow_counters_update AFTER UPDATE ON borrow "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION update_book_borrows_count()"
+    )
@@ -0,0 +1,191 @@
+"""Add denormalized counters
+
+Revision ID: d91c3f5a7e20
+Revises: b7d41e9a2c58
+Create Date: 2026-10-18 20:03:51.264913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91c3f5a7e20'
+down_revision: Union[str, None] = 'b7d41e9a2c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('author', sa.Column('books_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('book', sa.Column('borrows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('book', sa.Column('active_borrows_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        """
+        UPDATE author SET books_count = counts.books_count
+        FROM (SELECT author_id, count(*) AS books_count FROM book GROUP BY author_id) AS counts
+        WHERE author.id = counts.author_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE book
+        SET borrows_count = counts.borrows_count,
+            active_borrows_count = counts.active_borrows_count
+        FROM (
+            SELECT book_id,
+                   count(*) AS borrows_count,
+                   count(*) FILTER (WHERE NOT is_return) AS active_borrows_count
+            FROM borrow
+            GROUP BY book_id
+        ) AS counts
+        WHERE book.id = counts.book_id
+        """
+    )
+
+    # Statement-level triggers see every row changed by the statement through
+    # transition tables, so a batch insert or a cascade updates each parent once.
+    op.execute(
+        """
+        CREATE FUNCTION update_author_books_count() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids integer[];
+            deltas integer[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(author_id ORDER BY author_id), array_agg(delta ORDER BY author_id)
+                INTO ids, deltas
+                FROM (SELECT author_id, count(*) AS delta FROM new_rows GROUP BY author_id) AS changed;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(author_id ORDER BY author_id), array_agg(delta ORDER BY author_id)
+                INTO ids, deltas
+                FROM (SELECT author_id, -count(*) AS delta FROM old_rows GROUP BY author_id) AS changed;
+            ELSE
+                SELECT array_agg(author_id ORDER BY author_id), array_agg(delta ORDER BY author_id)
+                INTO ids, deltas
+                FROM (
+                    SELECT author_id, sum(delta) AS delta
+                    FROM (
+                        SELECT author_id, 1 AS delta FROM new_rows
+                        UNION ALL
+                        SELECT author_id, -1 AS delta FROM old_rows
+                    ) AS rows
+                    GROUP BY author_id
+                    HAVING sum(delta) <> 0
+                ) AS changed;
+            END IF;
+
+            IF ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            PERFORM 1 FROM author WHERE id = ANY(ids) ORDER BY id FOR NO KEY UPDATE;
+            UPDATE author
+            SET books_count = author.books_count + changed.delta,
+                version = author.version + 1
+            FROM unnest(ids, deltas) AS changed(id, delta)
+            WHERE author.id = changed.id;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION update_book_borrows_count() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids integer[];
+            deltas integer[];
+            active_deltas integer[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(book_id ORDER BY book_id),
+                       array_agg(delta ORDER BY book_id),
+                       array_agg(active_delta ORDER BY book_id)
+                INTO ids, deltas, active_deltas
+                FROM (
+                    SELECT book_id,
+                           count(*) AS delta,
+                           count(*) FILTER (WHERE NOT is_return) AS active_delta
+                    FROM new_rows
+                    GROUP BY book_id
+                ) AS changed;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(book_id ORDER BY book_id),
+                       array_agg(delta ORDER BY book_id),
+                       array_agg(active_delta ORDER BY book_id)
+                INTO ids, deltas, active_deltas
+                FROM (
+                    SELECT book_id,
+                           -count(*) AS delta,
+                           -count(*) FILTER (WHERE NOT is_return) AS active_delta
+                    FROM old_rows
+                    GROUP BY book_id
+                ) AS changed;
+            ELSE
+                SELECT array_agg(book_id ORDER BY book_id),
+                       array_agg(delta ORDER BY book_id),
+                       array_agg(active_delta ORDER BY book_id)
+                INTO ids, deltas, active_deltas
+                FROM (
+                    SELECT book_id, sum(delta) AS delta, sum(active_delta) AS active_delta
+                    FROM (
+                        SELECT book_id, 1 AS delta, CASE WHEN is_return THEN 0 ELSE 1 END AS active_delta
+                        FROM new_rows
+                        UNION ALL
+                        SELECT book_id, -1 AS delta, CASE WHEN is_return THEN 0 ELSE -1 END AS active_delta
+                        FROM old_rows
+                    ) AS rows
+                    GROUP BY book_id
+                    HAVING sum(delta) <> 0 OR sum(active_delta) <> 0
+                ) AS changed;
+            END IF;
+
+            IF ids IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            PERFORM 1 FROM book WHERE id = ANY(ids) ORDER BY id FOR NO KEY UPDATE;
+            UPDATE book
+            SET borrows_count = book.borrows_count + changed.delta,
+                active_borrows_count = book.active_borrows_count + changed.active_delta,
+                version = book.version + 1
+            FROM unnest(ids, deltas, active_deltas) AS changed(id, delta, active_delta)
+            WHERE book.id = changed.id;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+
+    for table, function in (("book", "update_author_books_count"), ("borrow", "update_book_borrows_count")):
+        op.execute(
+            f"CREATE TRIGGER {table}_counters_insert AFTER INSERT ON {table} "
+            f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_counters_update AFTER UPDATE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_counters_delete AFTER DELETE ON {table} "
+            f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+
+
+def downgrade() -> None:
+    for table in ("book", "borrow"):
+        for operation in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_counters_{operation} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS update_book_borrows_count()")
+    op.execute("DROP FUNCTION IF EXISTS update_author_books_count()")
+
+    op.drop_column('book', 'active_borrows_count')
+    op.drop_column('book', 'borrows_count')
+    op.drop_column('author', 'books_count')
@@ -0,0 +1,38 @@
+"""Add borrow filter indexes
+
+Revision ID: e2f6b1d9c835
+Revises: c5b7e90f4a12
+Create Date: 2026-10-18 14:21:09.418377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f6b1d9c835'
+down_revision: Union[str, None] = 'c5b7e90f4a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_borrow_book_id_id', 'borrow', ['book_id', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_borrow_reader_name_id', 'borrow', ['reader_name', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_borrow_active_reader_name_id', 'borrow', ['reader_name', 'id'], unique=False, postgresql_where=sa.text('is_return = false'), postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_borrow_borrow_date_id', 'borrow', ['borrow_date', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_borrow_reader_name', table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_borrow_book_id', table_name='borrow', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_borrow_book_id', 'borrow', ['book_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_borrow_reader_name', 'borrow', ['reader_name'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_borrow_borrow_date_id', table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_borrow_active_reader_name_id', table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_borrow_reader_name_id', table_name='borrow', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_borrow_book_id_id', table_name='borrow', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,29 @@
+"""Add book author_id, id index
+
+Revision ID: f03a8c6e1d27
+Revises: e2f6b1d9c835
+Create Date: 2026-10-18 15:05:36.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f03a8c6e1d27'
+down_revision: Union[str, None] = 'e2f6b1d9c835'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_author_id_id', 'book', ['author_id', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_book_author_id', table_name='book', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_author_id', 'book', ['author_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_book_author_id_id', table_name='book', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from time import monotonic
+from typing import Optional
+import asyncpg
+from sqlalchemy import make_url
+from app.config import (
+    CACHE_ENABLED,
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_MAX_SIZE,
+    CACHE_TTL,
+    DATABASE_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class NullCacheBackend(CacheBackend):
+    async def get(self, key: str) -> Optional[dict]:
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def delete_prefix(self, prefix: str) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "null"}
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        self.entries[key] = (monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            del self.entries[key]
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class EntityCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.generations: defaultdict[str, int] = defaultdict(int)
+
+    def generation(self, namespace: str) -> int:
+        return self.generations[namespace]
+
+    async def get(self, namespace: str, id: int) -> Optional[dict]:
+        return await self.backend.get(f"{namespace}:{id}")
+
+    async def set(self, namespace: str, id: int, value: dict, generation: int) -> None:
+        if self.generations[namespace] == generation:
+            await self.backend.set(f"{namespace}:{id}", value)
+
+    async def invalidate(self, namespace: str, id: Optional[int] = None) -> None:
+        self.generations[namespace] += 1
+        if id is None:
+            await self.backend.delete_prefix(f"{namespace}:")
+        else:
+            await self.backend.delete(f"{namespace}:{id}")
+
+    async def clear(self) -> None:
+        for namespace in list(self.generations):
+            self.generations[namespace] += 1
+        await self.backend.delete_prefix("")
+
+
+class CacheInvalidationListener:
+    """Propagates invalidations between workers with Postgres NOTIFY.
+
+    Every worker keeps its own MemoryCacheBackend, so an invalidation in one
+    worker alone leaves the others serving the old row until CACHE_TTL. The
+    notify_entity_cache triggers NOTIFY the channel set in
+    library.cache_channel with "namespace:id,id,..." ("namespace:" for the
+    whole namespace) from the writing transaction, so Postgres delivers it on
+    commit and never for a rolled back write. Each worker LISTENs on a
+    dedicated connection (outside the pool); while it is down the local cache
+    is cleared on reconnect, since notifications sent in between are lost.
+    """
+
+    def __init__(self, cache: EntityCache, url: str, channel: str, retry_seconds: float = 1.0):
+        self.cache = cache
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self.connection: Optional[asyncpg.Connection] = None
+        self.received = 0
+
+    async def run(self) -> None:
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except Exception:
+                logger.exception("Cache invalidation listener failed to connect")
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            try:
+                await connection.add_listener(self.channel, self.on_notification)
+                self.connection = connection
+                await self.cache.clear()
+                await closed.wait()
+                logger.warning("Cache invalidation listener disconnected")
+            finally:
+                self.connection = None
+                if not connection.is_closed():
+                    await connection.close()
+
+    async def on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        self.received += 1
+        namespace, _, ids = payload.partition(":")
+        if not ids:
+            await self.cache.invalidate(namespace)
+            return
+        for id in ids.split(","):
+            await self.cache.invalidate(namespace, int(id))
+
+    def stats(self) -> dict:
+        return {
+            "channel": self.channel,
+            "connected": self.connection is not None,
+            "received": self.received,
+        }
+
+
+entity_cache = EntityCache(
+    MemoryCacheBackend(max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL)
+    if CACHE_ENABLED
+    else NullCacheBackend()
+)
+cache_invalidation = (
+    CacheInvalidationListener(entity_cache, DATABASE_URL, CACHE_INVALIDATION_CHANNEL)
+    if CACHE_ENABLED and CACHE_INVALIDATION_CHANNEL and DATABASE_URL
+    else None
+)
@@ -4,3 +4,47 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", 50))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 500))
+INCLUDE_CHILDREN_MAX = int(os.environ.get("INCLUDE_CHILDREN_MAX", 20))
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+SEARCH_OFFSET_MAX = int(os.environ.get("SEARCH_OFFSET_MAX", 10000))
+SEARCH_PREFIX_MIN_LENGTH = int(os.environ.get("SEARCH_PREFIX_MIN_LENGTH", 3))
+BATCH_SIZE_MAX = int(os.environ.get("BATCH_SIZE_MAX", 1000))
+COPY_BUFFER_CHUNKS = int(os.environ.get("COPY_BUFFER_CHUNKS", 16))
+STATS_REFRESH_SECONDS = float(os.environ.get("STATS_REFRESH_SECONDS", 300))
+LOAN_PERIOD_DAYS = int(os.environ.get("LOAN_PERIOD_DAYS", 14))
+RECONCILE_BATCH_SIZE = int(os.environ.get("RECONCILE_BATCH_SIZE", 1000))
+PURGE_CHUNK_SIZE = int(os.environ.get("PURGE_CHUNK_SIZE", 1000))
+PURGE_JOBS_KEPT = int(os.environ.get("PURGE_JOBS_KEPT", 100))
+
+
+def get_bool_env(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+DB_ECHO = get_bool_env("DB_ECHO", False)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = get_bool_env("DB_POOL_PRE_PING", False)
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+DB_WARMUP_CONNECTIONS = int(os.environ.get("DB_WARMUP_CONNECTIONS", DB_POOL_SIZE))
+DB_REPLICA_SELECTION = os.environ.get("DB_REPLICA_SELECTION", "round_robin")
+DB_READ_YOUR_WRITES_SECONDS = float(os.environ.get("DB_READ_YOUR_WRITES_SECONDS", 5))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get("HEALTH_CHECK_TIMEOUT", 2))
+SHUTDOWN_DRAIN_SECONDS = float(os.environ.get("SHUTDOWN_DRAIN_SECONDS", 30))
+SHUTDOWN_DELAY_SECONDS = float(os.environ.get("SHUTDOWN_DELAY_SECONDS", 5))
+
+CACHE_ENABLED = get_bool_env("CACHE_ENABLED", True)
+CACHE_MAX_SIZE = int(os.environ.get("CACHE_MAX_SIZE", 10000))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 30))
+CACHE_INVALIDATION_CHANNEL = os.environ.get("CACHE_INVALIDATION_CHANNEL", "entity_cache")
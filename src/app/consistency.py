@@ -0,0 +1,28 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .database import WriteState, current_write_state, primary_until_cookie, replica_engines
+
+
+class ReadYourWritesMiddleware:
+    # After a request commits on the primary, the client gets a cookie that sends
+    # its reads to the primary until replicas have had time to catch up.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not replica_engines:
+            await self.app(scope, receive, send)
+            return
+
+        state = WriteState()
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and state.committed:
+                MutableHeaders(scope=message).append("Set-Cookie", primary_until_cookie())
+            await send(message)
+
+        token = current_write_state.set(state)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            current_write_state.reset(token)
@@ -1,23 +1,34 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import asc, func, text
-from ..models import Author
+from sqlalchemy import Integer, asc, bindparam, delete, func, insert, literal, or_, true, update
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import AsyncGenerator, Optional, Sequence, Union
+from collections import defaultdict
+from ..config import EXPORT_CHUNK_SIZE, INCLUDE_CHILDREN_MAX, PAGE_SIZE_DEFAULT
+from ..cache import entity_cache
+from ..models import Author, Book
+from ..schemes import AuthorCreateScheme, AuthorScheme
 from datetime import date
 from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+AUTHOR_COLUMNS = (
+    Author.id,
+    Author.name,
+    Author.surname,
+    Author.date_of_birth,
+    Author.version,
+    Author.books_count,
+)
+
+GET_AUTHOR = select(*AUTHOR_COLUMNS).filter(Author.id == bindparam("id"))
 
 
 async def create_author(
     name: str, surname: str, date_of_birth: date, db: AsyncSession
 ) -> Author:
     try:
-
-        result = await db.execute(select(func.count()).select_from(Author))
-        count = result.scalar()
-
-        if count == 0:
-            await db.execute(
-                text("SELECT setval(pg_get_serial_sequence('author', 'id'), 1, false);")
-            )
-
         new_author = Author(name=name, surname=surname, date_of_birth=date_of_birth)
         db.add(new_author)
         await db.commit()
@@ -30,46 +41,230 @@ async def create_author(
         raise
 
 
-async def get_all_authors(db: AsyncSession) -> list[Author]:
+async def create_authors(
+    authors: Sequence[AuthorCreateScheme], db: AsyncSession
+) -> list[Row]:
+    try:
+        result = await db.execute(
+            insert(Author).returning(
+                *Author.__table__.c, sort_by_parameter_order=True
+            ),
+            [author.model_dump() for author in authors],
+        )
+        new_authors = result.all()
+        await db.commit()
+
+        return new_authors
+
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def get_all_authors(
+    db: AsyncSession,
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    include_books: bool = False,
+) -> tuple[list[Union[Author, Row]], Optional[int]]:
+    try:
+        if include_books:
+            query = select(Author)
+        else:
+            query = select(*AUTHOR_COLUMNS)
+        query = query.order_by(asc(Author.id)).limit(limit + 1)
+        if after is not None:
+            query = query.filter(Author.id > after)
+
+        result = await db.execute(query)
+        authors = result.scalars().all() if include_books else result.all()
+        if not authors:
+            return None
+
+        next_cursor = authors[limit - 1].id if len(authors) > limit else None
+        if include_books:
+            await load_first_books(authors[:limit], db)
+        return authors[:limit], next_cursor
+    except Exception:
+        raise
+
+
+async def get_all_authors_versions(
+    db: AsyncSession,
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+) -> tuple[list[tuple[int, int]], Optional[int]]:
+    try:
+        query = select(Author.id, Author.version).order_by(asc(Author.id)).limit(limit + 1)
+        if after is not None:
+            query = query.filter(Author.id > after)
+
+        result = await db.execute(query)
+        versions = result.all()
+        if not versions:
+            return None
+
+        next_cursor = versions[limit - 1].id if len(versions) > limit else None
+        return versions[:limit], next_cursor
+    except Exception:
+        raise
+
+
+async def stream_authors(
+    db: AsyncSession, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncGenerator[Sequence[Row], None]:
     try:
-        result = await db.execute(select(Author).order_by(asc(Author.id)))
-        authors = result.scalars().all()
+        result = await db.stream(
+            select(*AUTHOR_COLUMNS)
+            .order_by(asc(Author.id))
+            .execution_options(yield_per=chunk_size)
+        )
+        async for authors in result.partitions():
+            yield authors
+    except Exception:
+        raise
+
+
+async def search_authors(
+    q: str,
+    db: AsyncSession,
+    offset: int = 0,
+    limit: int = PAGE_SIZE_DEFAULT,
+) -> tuple[list[Row], Optional[int]]:
+    try:
+        q = q.strip()
+        if not q:
+            return None
+
+        similarity = func.greatest(
+            func.similarity(Author.name, q), func.similarity(Author.surname, q)
+        )
+        result = await db.execute(
+            select(*AUTHOR_COLUMNS)
+            .filter(
+                or_(
+                    Author.name.istartswith(q, autoescape=True),
+                    Author.surname.istartswith(q, autoescape=True),
+                    Author.name.op("%")(q),
+                    Author.surname.op("%")(q),
+                )
+            )
+            .order_by(similarity.desc(), asc(Author.id))
+            .offset(offset)
+            .limit(limit + 1)
+        )
+        authors = result.all()
         if not authors:
             return None
 
-        return authors
+        next_offset = offset + limit if len(authors) > limit else None
+        return authors[:limit], next_offset
+    except Exception:
+        raise
+
+
+async def get_author(id: int, db: AsyncSession) -> AuthorScheme:
+    try:
+        cached = await entity_cache.get("author", id)
+        if cached:
+            return AuthorScheme(**cached)
+
+        generation = entity_cache.generation("author")
+        result = await db.execute(GET_AUTHOR, {"id": id})
+        author = result.first()
+        if not author:
+            return None
+
+        author = AuthorScheme(**author._mapping)
+        await entity_cache.set("author", id, author.model_dump(mode="json"), generation)
+
+        return author
+
     except Exception:
         raise
 
 
-async def get_author(id: int, db: AsyncSession) -> Author:
+async def load_first_books(
+    authors: Sequence[Author], db: AsyncSession, limit: int = INCLUDE_CHILDREN_MAX
+) -> None:
+    # Same as book.load_first_borrows: at most `limit` books per author, the
+    # rest is paged through /authors/{id}/books.
+    parents = (
+        func.unnest(literal([author.id for author in authors], ARRAY(Integer)))
+        .table_valued("id")
+        .render_derived(name="parents")
+    )
+    first_books = aliased(
+        Book,
+        select(Book)
+        .filter(Book.author_id == parents.c.id)
+        .order_by(asc(Book.id))
+        .limit(limit)
+        .lateral(),
+    )
+    result = await db.execute(
+        select(first_books)
+        .select_from(parents)
+        .join(first_books, true())
+        .order_by(first_books.author_id, first_books.id)
+    )
+    books = defaultdict(list)
+    for book in result.scalars():
+        books[book.author_id].append(book)
+    for author in authors:
+        set_committed_value(author, "books", books[author.id])
+
+
+async def get_author_with_books(id: int, db: AsyncSession) -> Author:
     try:
         result = await db.execute(select(Author).filter(Author.id == id))
         author = result.scalars().first()
         if not author:
             return None
-        
-        return author
 
+        await load_first_books([author], db)
+        return author
     except Exception:
         raise
 
 
 async def update_author(
-    id: int, name: str, surname: str, date_of_birth: date, db: AsyncSession
-) -> Author:
+    id: int,
+    name: str,
+    surname: str,
+    date_of_birth: date,
+    db: AsyncSession,
+    versions: Optional[list[int]] = None,
+) -> Union[Row, None, bool]:
+    return await patch_author(
+        id,
+        {"name": name, "surname": surname, "date_of_birth": date_of_birth},
+        db,
+        versions=versions,
+    )
+
+
+async def patch_author(
+    id: int, values: dict, db: AsyncSession, versions: Optional[list[int]] = None
+) -> Union[Row, None, bool]:
     try:
-        result = await db.execute(select(Author).filter(Author.id == id))
-        current_author = result.scalars().first()
+        query = update(Author).where(Author.id == id)
+        if versions is not None:
+            query = query.where(Author.version.in_(versions))
+
+        result = await db.execute(
+            query.values(**values, version=Author.version + 1).returning(*AUTHOR_COLUMNS)
+        )
+        current_author = result.first()
 
         if not current_author:
-            return None
+            author = await db.execute(select(Author.id).filter(Author.id == id))
+            author = author.scalar()
+            await db.rollback()
+            return None if author is None else False
 
-        current_author.name = name
-        current_author.surname = surname
-        current_author.date_of_birth = date_of_birth
         await db.commit()
-        await db.refresh(current_author)
+        await entity_cache.invalidate("author", id)
 
         return current_author
 
@@ -80,13 +275,15 @@ async def update_author(
 
 async def delete_author(id: int, db: AsyncSession) -> bool:
     try:
-        result = await db.execute(select(Author).filter(Author.id == id))
-        current_author = result.scalars().first()
-        if not current_author:
+        result = await db.execute(delete(Author).where(Author.id == id).returning(Author.id))
+        if result.scalar() is None:
+            await db.rollback()
             return False
 
-        await db.delete(current_author)
         await db.commit()
+        await entity_cache.invalidate("author", id)
+        await entity_cache.invalidate("book")
+        await entity_cache.invalidate("borrow")
         return True
     except Exception:
         await db.rollback()
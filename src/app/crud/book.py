@@ -1,7 +1,37 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import asc, func, text
-from ..models import Book, Author
+from sqlalchemy import Integer, asc, bindparam, delete, func, insert, literal, true, update
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import AsyncGenerator, Optional, Sequence, Union
+from collections import defaultdict
+from ..config import (
+    EXPORT_CHUNK_SIZE,
+    INCLUDE_CHILDREN_MAX,
+    PAGE_SIZE_DEFAULT,
+    SEARCH_PREFIX_MIN_LENGTH,
+)
+from ..cache import entity_cache
+from ..models import Book, Author, Borrow
+from ..schemes import BookCreateScheme, BookScheme
 from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+import re
+
+BOOK_COLUMNS = (
+    Book.id,
+    Book.title,
+    Book.description,
+    Book.author_id,
+    Book.available_copies,
+    Book.version,
+    Book.borrows_count,
+    Book.active_borrows_count,
+)
+
+# Built once at import: the statement memoizes its cache key, so each call
+# skips constructing the query and deriving the key for the compiled cache.
+GET_BOOK = select(*BOOK_COLUMNS).filter(Book.id == bindparam("id"))
 
 
 async def create_book(
@@ -19,14 +49,6 @@ async def create_book(
         if not author:
             return None
 
-        result = await db.execute(select(func.count()).select_from(Book))
-        count = result.scalar()
-
-        if count == 0:
-            await db.execute(
-                text("SELECT setval(pg_get_serial_sequence('book', 'id'), 1, false);")
-            )
-
         new_book = Book(
             title=title,
             description=description,
@@ -35,6 +57,7 @@ async def create_book(
         )
         db.add(new_book)
         await db.commit()
+        await entity_cache.invalidate("author", author_id)
         await db.refresh(new_book)
 
         return new_book
@@ -43,24 +66,208 @@ async def create_book(
         raise
 
 
-async def get_all_books(db: AsyncSession) -> list[Book]:
+async def create_books(
+    books: Sequence[BookCreateScheme], db: AsyncSession
+) -> list[Optional[Row]]:
     try:
-        result = await db.execute(select(Book).order_by(asc(Book.id)))
-        books = result.scalars().all()
+        author_ids = {book.author_id for book in books}
+        result = await db.execute(
+            select(Author.id)
+            .filter(Author.id.in_(author_ids))
+            .order_by(Author.id)
+            .with_for_update(read=True, key_share=True)
+        )
+        existing_ids = set(result.scalars().all())
+
+        valid_books = [book for book in books if book.author_id in existing_ids]
+        new_books = []
+        if valid_books:
+            result = await db.execute(
+                insert(Book).returning(
+                    *[column for column in Book.__table__.c if column.key != "search_vector"],
+                    sort_by_parameter_order=True,
+                ),
+                [book.model_dump() for book in valid_books],
+            )
+            new_books = result.all()
+        await db.commit()
+        for author_id in {book.author_id for book in valid_books}:
+            await entity_cache.invalidate("author", author_id)
+
+        inserted = iter(new_books)
+        return [
+            next(inserted) if book.author_id in existing_ids else None
+            for book in books
+        ]
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def get_all_books(
+    db: AsyncSession,
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    author_id: Optional[int] = None,
+    include_borrows: bool = False,
+) -> tuple[list[Union[Book, Row]], Optional[int]]:
+    try:
+        if include_borrows:
+            query = select(Book)
+        else:
+            query = select(*BOOK_COLUMNS)
+        query = query.order_by(asc(Book.id)).limit(limit + 1)
+        if author_id is not None:
+            query = query.filter(Book.author_id == author_id)
+        if after is not None:
+            query = query.filter(Book.id > after)
+
+        result = await db.execute(query)
+        books = result.scalars().all() if include_borrows else result.all()
         if not books:
             return None
 
-        return books
+        next_cursor = books[limit - 1].id if len(books) > limit else None
+        if include_borrows:
+            await load_first_borrows(books[:limit], db)
+        return books[:limit], next_cursor
     except Exception:
         raise
 
 
-async def get_book(id: int, db: AsyncSession) -> Book:
+async def get_all_books_versions(
+    db: AsyncSession,
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+) -> tuple[list[tuple[int, int]], Optional[int]]:
+    try:
+        query = select(Book.id, Book.version).order_by(asc(Book.id)).limit(limit + 1)
+        if after is not None:
+            query = query.filter(Book.id > after)
+
+        result = await db.execute(query)
+        versions = result.all()
+        if not versions:
+            return None
+
+        next_cursor = versions[limit - 1].id if len(versions) > limit else None
+        return versions[:limit], next_cursor
+    except Exception:
+        raise
+
+
+async def stream_books(
+    db: AsyncSession, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncGenerator[Sequence[Row], None]:
+    try:
+        result = await db.stream(
+            select(*BOOK_COLUMNS)
+            .order_by(asc(Book.id))
+            .execution_options(yield_per=chunk_size)
+        )
+        async for books in result.partitions():
+            yield books
+    except Exception:
+        raise
+
+
+async def search_books(
+    q: str,
+    db: AsyncSession,
+    offset: int = 0,
+    limit: int = PAGE_SIZE_DEFAULT,
+) -> tuple[list[Row], Optional[int]]:
+    try:
+        terms = re.findall(r"\w+", q)
+        if not terms:
+            return None
+
+        # A one- or two-letter prefix matches a large part of the catalog and
+        # every match gets ranked, so short terms only match whole words.
+        query = func.to_tsquery(
+            "simple",
+            " & ".join(
+                f"{term}:*" if len(term) >= SEARCH_PREFIX_MIN_LENGTH else term
+                for term in terms
+            ),
+        )
+        result = await db.execute(
+            select(*BOOK_COLUMNS)
+            .filter(Book.search_vector.op("@@")(query))
+            .order_by(func.ts_rank(Book.search_vector, query).desc(), asc(Book.id))
+            .offset(offset)
+            .limit(limit + 1)
+        )
+        books = result.all()
+        if not books:
+            return None
+
+        next_offset = offset + limit if len(books) > limit else None
+        return books[:limit], next_offset
+    except Exception:
+        raise
+
+
+async def get_book(id: int, db: AsyncSession) -> BookScheme:
+    try:
+        cached = await entity_cache.get("book", id)
+        if cached:
+            return BookScheme(**cached)
+
+        generation = entity_cache.generation("book")
+        result = await db.execute(GET_BOOK, {"id": id})
+        book = result.first()
+        if not book:
+            return None
+
+        book = BookScheme(**book._mapping)
+        await entity_cache.set("book", id, book.model_dump(mode="json"), generation)
+
+        return book
+    except Exception:
+        raise
+
+
+async def load_first_borrows(
+    books: Sequence[Book], db: AsyncSession, limit: int = INCLUDE_CHILDREN_MAX
+) -> None:
+    # selectinload would fetch every borrow of every book; a LATERAL ... LIMIT
+    # per book reads at most `limit` rows of the (book_id, id) index each. The
+    # rest is paged through /books/{id}/borrows.
+    parents = (
+        func.unnest(literal([book.id for book in books], ARRAY(Integer)))
+        .table_valued("id")
+        .render_derived(name="parents")
+    )
+    first_borrows = aliased(
+        Borrow,
+        select(Borrow)
+        .filter(Borrow.book_id == parents.c.id)
+        .order_by(asc(Borrow.id))
+        .limit(limit)
+        .lateral(),
+    )
+    result = await db.execute(
+        select(first_borrows)
+        .select_from(parents)
+        .join(first_borrows, true())
+        .order_by(first_borrows.book_id, first_borrows.id)
+    )
+    borrows = defaultdict(list)
+    for borrow in result.scalars():
+        borrows[borrow.book_id].append(borrow)
+    for book in books:
+        set_committed_value(book, "borrows", borrows[book.id])
+
+
+async def get_book_with_borrows(id: int, db: AsyncSession) -> Book:
     try:
         result = await db.execute(select(Book).filter(Book.id == id))
         book = result.scalars().first()
         if not book:
             return None
+
+        await load_first_borrows([book], db)
         return book
     except Exception:
         raise
@@ -73,22 +280,66 @@ async def update_book(
     author_id: int,
     available_copies: int,
     db: AsyncSession,
-) -> Book:
+    versions: Optional[list[int]] = None,
+) -> Union[Row, None, bool, str]:
+    return await patch_book(
+        id,
+        {
+            "title": title,
+            "description": description,
+            "author_id": author_id,
+            "available_copies": available_copies,
+        },
+        db,
+        versions=versions,
+    )
+
+
+async def patch_book(
+    id: int, values: dict, db: AsyncSession, versions: Optional[list[int]] = None
+) -> Union[Row, None, bool, str]:
     try:
-        result = await db.execute(select(Book).filter(Book.id == id))
-        current_book = result.scalars().first()
+        query = update(Book).where(Book.id == id)
+        if versions is not None:
+            query = query.where(Book.version.in_(versions))
+
+        columns = BOOK_COLUMNS
+        if "author_id" in values:
+            # The locked pre-update row gives the previous author in the same
+            # round trip, so both authors' cached counters can be dropped.
+            previous = (
+                select(Book.id, Book.author_id)
+                .filter(Book.id == id)
+                .with_for_update()
+                .subquery("previous")
+            )
+            query = query.where(
+                Book.id == previous.c.id,
+                select(Author.id).filter(Author.id == values["author_id"]).exists(),
+            )
+            columns += (previous.c.author_id.label("previous_author_id"),)
+
+        result = await db.execute(
+            query.values(**values, version=Book.version + 1).returning(*columns)
+        )
+        current_book = result.first()
 
         if not current_book:
-            return None
+            version = await db.execute(select(Book.version).filter(Book.id == id))
+            version = version.scalar()
+            await db.rollback()
+            if version is None:
+                return None
+            if versions is not None and version not in versions:
+                return False
+            return "Author not found"
 
-        current_book.title = title
-        current_book.description = description
-        current_book.author_id = author_id
-        current_book.available_copies = available_copies
         await db.commit()
-        await db.refresh(current_book)
+        await entity_cache.invalidate("book", id)
+        if "author_id" in values and current_book.previous_author_id != current_book.author_id:
+            await entity_cache.invalidate("author", current_book.previous_author_id)
+            await entity_cache.invalidate("author", current_book.author_id)
 
-        
         return current_book
 
     except Exception:
@@ -98,13 +349,16 @@ async def update_book(
 
 async def delete_book(id: int, db: AsyncSession) -> bool:
     try:
-        result = await db.execute(select(Book).filter(Book.id == id))
-        current_book = result.scalars().first()
-        if not current_book:
+        result = await db.execute(delete(Book).where(Book.id == id).returning(Book.author_id))
+        author_id = result.scalar()
+        if author_id is None:
+            await db.rollback()
             return False
-        
-        await db.delete(current_book)
+
         await db.commit()
+        await entity_cache.invalidate("book", id)
+        await entity_cache.invalidate("author", author_id)
+        await entity_cache.invalidate("borrow")
         return True
     except Exception:
         await db.rollback()
@@ -1,12 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import asc, func, text
-from typing import Optional
+from sqlalchemy import Date, Integer, Select, String, and_, any_, asc, bindparam, false, func, insert, literal, true, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Row
+from typing import AsyncGenerator, Optional, Sequence, Union
+from ..config import EXPORT_CHUNK_SIZE, PAGE_SIZE_DEFAULT
+from ..cache import entity_cache
 from ..models import Borrow, Book
 from datetime import date
-from ..schemes import BorrowScheme, BorrowUpdateScheme
+from ..schemes import BorrowFilterScheme, BorrowScheme, BorrowUpdateScheme
 from sqlalchemy.future import select
 import logging
 
+BORROW_COLUMNS = (
+    Borrow.id,
+    Borrow.book_id,
+    Borrow.reader_name,
+    Borrow.borrow_date,
+    Borrow.return_date,
+    Borrow.is_return,
+    Borrow.version,
+)
+
+GET_BORROW = select(*BORROW_COLUMNS).filter(Borrow.id == bindparam("id"))
+
 logging.basicConfig(level=logging.INFO)
 
 
@@ -18,63 +34,281 @@ async def create_borrow(
     return_date: Optional[date] = None,
 ) -> BorrowScheme:
     try:
-        book = await db.execute(select(Book).filter(Book.id == book_id))
-        book = book.scalars().first()
+        if return_date and return_date < borrow_date:
+            return "Invalid return_date"
 
-        if not book:
-            return None
+        # Borrows have no insert or update counter triggers: the counters
+        # change here and on return, in the update that locks the book anyway.
+        reserved = (
+            update(Book)
+            .where(Book.id == book_id, Book.available_copies > 0)
+            .values(
+                available_copies=Book.available_copies - 1,
+                borrows_count=Book.borrows_count + 1,
+                active_borrows_count=Book.active_borrows_count + 1,
+                version=Book.version + 1,
+            )
+            .returning(Book.id)
+            .cte("reserved")
+        )
+        result = await db.execute(
+            insert(Borrow)
+            .from_select(
+                [
+                    "book_id",
+                    "reader_name",
+                    "borrow_date",
+                    "return_date",
+                    "is_return",
+                    "version",
+                ],
+                select(
+                    reserved.c.id,
+                    literal(reader_name, String),
+                    literal(borrow_date, Date),
+                    literal(return_date, Date),
+                    false(),
+                    literal(1, Integer),
+                ),
+            )
+            .returning(*Borrow.__table__.c)
+        )
+        new_borrow = result.first()
+
+        if not new_borrow:
+            book = await db.execute(select(Book.id).filter(Book.id == book_id))
+            book = book.scalar()
+            await db.rollback()
+            return None if book is None else False
+
+        await db.commit()
+        await entity_cache.invalidate("book", book_id)
+
+        return new_borrow
+    except Exception:
+        await db.rollback()
+        raise
 
-        if book.available_copies == 0:
-            return False
 
+async def create_borrows(
+    book_ids: Sequence[int],
+    reader_name: str,
+    borrow_date: date,
+    db: AsyncSession,
+    return_date: Optional[date] = None,
+    atomic: bool = True,
+) -> list[Union[Row, bool, str, None]]:
+    try:
         if return_date and return_date < borrow_date:
             return "Invalid return_date"
 
-        book.available_copies -= 1
+        locked = (
+            select(Book.id, Book.available_copies)
+            .where(Book.id == any_(literal(list(book_ids), ARRAY(Integer))))
+            .order_by(Book.id)
+            .with_for_update()
+            .cte("locked")
+        )
+        requested = (
+            func.unnest(literal(list(book_ids), ARRAY(Integer)))
+            .table_valued("book_id", with_ordinality="ordinal")
+            .render_derived(name="requested")
+        )
+        wanted = (
+            select(requested.c.book_id, func.count().label("quantity"))
+            .group_by(requested.c.book_id)
+            .subquery("wanted")
+        )
+        # A book listed more times than it has copies left gives out what it
+        # has, to its first occurrences in the request.
+        granted = func.least(locked.c.available_copies, wanted.c.quantity)
+        reserved = (
+            update(Book)
+            .where(
+                Book.id == locked.c.id,
+                Book.id == wanted.c.book_id,
+                locked.c.available_copies > 0,
+            )
+            .values(
+                available_copies=Book.available_copies - granted,
+                borrows_count=Book.borrows_count + granted,
+                active_borrows_count=Book.active_borrows_count + granted,
+                version=Book.version + 1,
+            )
+            .returning(Book.id, granted.label("granted"))
+            .cte("reserved")
+        )
+        occurrences = select(
+            requested.c.book_id,
+            requested.c.ordinal,
+            func.row_number()
+            .over(partition_by=requested.c.book_id, order_by=requested.c.ordinal)
+            .label("occurrence"),
+        ).subquery("occurrences")
+        result = await db.execute(
+            insert(Borrow)
+            .from_select(
+                [
+                    "book_id",
+                    "reader_name",
+                    "borrow_date",
+                    "return_date",
+                    "is_return",
+                    "version",
+                ],
+                select(
+                    occurrences.c.book_id,
+                    literal(reader_name, String),
+                    literal(borrow_date, Date),
+                    literal(return_date, Date),
+                    false(),
+                    literal(1, Integer),
+                )
+                .join_from(
+                    occurrences,
+                    reserved,
+                    and_(
+                        reserved.c.id == occurrences.c.book_id,
+                        occurrences.c.occurrence <= reserved.c.granted,
+                    ),
+                )
+                .order_by(occurrences.c.ordinal),
+            )
+            .returning(*Borrow.__table__.c)
+        )
+        # Ids follow the request order, so each book's borrows go to its
+        # occurrences in the request from the first one.
+        new_borrows = {}
+        for borrow in sorted(result.all(), key=lambda borrow: borrow.id):
+            new_borrows.setdefault(borrow.book_id, []).append(borrow)
+        reserved_ids = set(new_borrows)
 
-        result = await db.execute(select(func.count()).select_from(Borrow))
-        count = result.scalar()
+        results = [
+            new_borrows[book_id].pop(0) if new_borrows.get(book_id) else None
+            for book_id in book_ids
+        ]
+        failed_ids = {
+            book_id for book_id, borrow in zip(book_ids, results) if borrow is None
+        }
+        existing_ids = set()
+        if failed_ids:
+            books = await db.execute(select(Book.id).filter(Book.id.in_(failed_ids)))
+            existing_ids = set(books.scalars().all())
 
-        if count == 0:
-            await db.execute(
-                text("SELECT setval(pg_get_serial_sequence('borrow', 'id'), 1, false);")
-            )
+        results = [
+            borrow if borrow is not None else (False if book_id in existing_ids else None)
+            for book_id, borrow in zip(book_ids, results)
+        ]
+
+        if failed_ids and atomic:
+            await db.rollback()
+            return [
+                "Rolled back" if isinstance(borrow, Row) else borrow
+                for borrow in results
+            ]
 
-        new_borrow = Borrow(
-            book_id=book_id,
-            reader_name=reader_name,
-            borrow_date=borrow_date,
-            return_date=return_date,
-        )
-        db.add(new_borrow)
         await db.commit()
-        await db.refresh(book)
-        await db.refresh(new_borrow)
+        for book_id in reserved_ids:
+            await entity_cache.invalidate("book", book_id)
 
-        return new_borrow
+        return results
     except Exception:
         await db.rollback()
         raise
 
 
-async def get_all_borrows(db: AsyncSession) -> list[BorrowScheme]:
+def filter_borrows(query: Select, filters: Optional[BorrowFilterScheme]) -> Select:
+    if filters is None:
+        return query
+    if filters.book_id is not None:
+        query = query.filter(Borrow.book_id == filters.book_id)
+    if filters.reader_name is not None:
+        query = query.filter(Borrow.reader_name == filters.reader_name)
+    if filters.is_return is not None:
+        query = query.filter(Borrow.is_return == (true() if filters.is_return else false()))
+    if filters.borrow_date_from is not None:
+        query = query.filter(Borrow.borrow_date >= filters.borrow_date_from)
+    if filters.borrow_date_to is not None:
+        query = query.filter(Borrow.borrow_date <= filters.borrow_date_to)
+    return query
+
+
+async def get_all_borrows(
+    db: AsyncSession,
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    filters: Optional[BorrowFilterScheme] = None,
+) -> tuple[list[Row], Optional[int]]:
     try:
-        result = await db.execute(select(Borrow).order_by(asc(Borrow.id)))
-        borrows = result.scalars().all()
+        query = select(*BORROW_COLUMNS).order_by(asc(Borrow.id)).limit(limit + 1)
+        query = filter_borrows(query, filters)
+        if after is not None:
+            query = query.filter(Borrow.id > after)
+
+        result = await db.execute(query)
+        borrows = result.all()
         if not borrows:
             return None
-        return borrows
+
+        next_cursor = borrows[limit - 1].id if len(borrows) > limit else None
+        return borrows[:limit], next_cursor
+    except Exception:
+        raise
+
+
+async def get_all_borrows_versions(
+    db: AsyncSession,
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    filters: Optional[BorrowFilterScheme] = None,
+) -> tuple[list[tuple[int, int]], Optional[int]]:
+    try:
+        query = select(Borrow.id, Borrow.version).order_by(asc(Borrow.id)).limit(limit + 1)
+        query = filter_borrows(query, filters)
+        if after is not None:
+            query = query.filter(Borrow.id > after)
+
+        result = await db.execute(query)
+        versions = result.all()
+        if not versions:
+            return None
+
+        next_cursor = versions[limit - 1].id if len(versions) > limit else None
+        return versions[:limit], next_cursor
+    except Exception:
+        raise
+
+
+async def stream_borrows(
+    db: AsyncSession, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncGenerator[Sequence[Row], None]:
+    try:
+        result = await db.stream(
+            select(*BORROW_COLUMNS)
+            .order_by(asc(Borrow.id))
+            .execution_options(yield_per=chunk_size)
+        )
+        async for borrows in result.partitions():
+            yield borrows
     except Exception:
         raise
 
 
 async def get_borrow(id: int, db: AsyncSession) -> BorrowScheme:
     try:
-        result = await db.execute(select(Borrow).filter(Borrow.id == id))
-        borrow = result.scalars().first()
+        cached = await entity_cache.get("borrow", id)
+        if cached:
+            return BorrowScheme(**cached)
+
+        generation = entity_cache.generation("borrow")
+        result = await db.execute(GET_BORROW, {"id": id})
+        borrow = result.first()
         if not borrow:
             return None
 
+        borrow = BorrowScheme(**borrow._mapping)
+        await entity_cache.set("borrow", id, borrow.model_dump(mode="json"), generation)
+
         return borrow
     except Exception:
         raise
@@ -84,28 +318,136 @@ async def finished_borrow(
     id: int, return_date: date, db: AsyncSession
 ) -> BorrowUpdateScheme:
     try:
-        result = await db.execute(select(Borrow).filter(Borrow.id == id))
-        borrow = result.scalars().first()
+        returned = (
+            update(Borrow)
+            .where(
+                Borrow.id == id,
+                Borrow.is_return.is_(False),
+                Borrow.borrow_date <= return_date,
+            )
+            .values(return_date=return_date, is_return=True, version=Borrow.version + 1)
+            .returning(*Borrow.__table__.c)
+            .cte("returned")
+        )
+        released = (
+            update(Book)
+            .where(Book.id == returned.c.book_id)
+            .values(
+                available_copies=Book.available_copies + 1,
+                active_borrows_count=Book.active_borrows_count - 1,
+                version=Book.version + 1,
+            )
+            .cte("released")
+        )
+        result = await db.execute(select(returned).add_cte(released))
+        borrow = result.first()
+
         if not borrow:
-            return None
-        if borrow.is_return:
-            return False
-        if return_date < borrow.borrow_date:
+            is_return = await db.execute(
+                select(Borrow.is_return).filter(Borrow.id == id)
+            )
+            is_return = is_return.scalar()
+            await db.rollback()
+            if is_return is None:
+                return None
+            if is_return:
+                return False
             return "Invalid return_date"
 
-        borrow.return_date = return_date
-        borrow.is_return = True
+        await db.commit()
+        await entity_cache.invalidate("borrow", id)
+        await entity_cache.invalidate("book", borrow.book_id)
+
+        return borrow
+
+    except Exception:
+        await db.rollback()
+        raise
 
-        book = await db.execute(select(Book).filter(Book.id == borrow.book_id))
-        book = book.scalars().first()
-        book.available_copies += 1
+
+async def finished_borrows(
+    ids: Sequence[int], return_date: date, db: AsyncSession, atomic: bool = True
+) -> list[Union[Row, bool, str, None]]:
+    try:
+        locked = (
+            select(Borrow.id)
+            .where(Borrow.id == any_(literal(list(ids), ARRAY(Integer))))
+            .order_by(Borrow.id)
+            .with_for_update()
+            .cte("locked")
+        )
+        locked_books = (
+            select(Book.id)
+            .where(Book.id.in_(select(Borrow.book_id).where(Borrow.id == locked.c.id)))
+            .order_by(Book.id)
+            .with_for_update()
+            .cte("locked_books")
+        )
+        returned = (
+            update(Borrow)
+            .where(
+                Borrow.id == locked.c.id,
+                Borrow.is_return.is_(False),
+                Borrow.borrow_date <= return_date,
+            )
+            .values(return_date=return_date, is_return=True, version=Borrow.version + 1)
+            .returning(*Borrow.__table__.c)
+            .cte("returned")
+        )
+        counts = (
+            select(returned.c.book_id, func.count().label("quantity"))
+            .group_by(returned.c.book_id)
+            .subquery("counts")
+        )
+        released = (
+            update(Book)
+            .where(Book.id == locked_books.c.id, Book.id == counts.c.book_id)
+            .values(
+                available_copies=Book.available_copies + counts.c.quantity,
+                active_borrows_count=Book.active_borrows_count - counts.c.quantity,
+                version=Book.version + 1,
+            )
+            .cte("released")
+        )
+        result = await db.execute(select(returned).add_cte(released))
+        borrows = {borrow.id: borrow for borrow in result.all()}
+
+        failed_ids = set(ids) - set(borrows)
+        states = {}
+        if failed_ids:
+            states = await db.execute(
+                select(Borrow.id, Borrow.is_return).filter(Borrow.id.in_(failed_ids))
+            )
+            states = dict(states.all())
+
+        # A borrow listed twice is returned once; its later occurrences get
+        # the same answer as a borrow returned before.
+        results = []
+        for id in ids:
+            if id in borrows:
+                results.append(borrows.pop(id))
+                states[id] = True
+            elif id not in states:
+                results.append(None)
+            else:
+                results.append(False if states[id] else "Invalid return_date")
+        succeeded = [borrow for borrow in results if isinstance(borrow, Row)]
+
+        if len(succeeded) < len(ids) and atomic:
+            await db.rollback()
+            return [
+                "Rolled back" if isinstance(borrow, Row) else borrow
+                for borrow in results
+            ]
 
         await db.commit()
-        await db.refresh(borrow)
-        await db.refresh(book)
+        for borrow in succeeded:
+            await entity_cache.invalidate("borrow", borrow.id)
+        for book_id in {borrow.book_id for borrow in succeeded}:
+            await entity_cache.invalidate("book", book_id)
+
+        return results
 
-        return borrow
-    
     except Exception:
         await db.rollback()
         raise
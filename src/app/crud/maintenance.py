@@ -0,0 +1,212 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import func, or_, text, update
+from ..cache import entity_cache
+from ..config import PURGE_JOBS_KEPT
+from ..models import Author, Book, Borrow
+from .purge import run_in_background
+from sqlalchemy.future import select
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_LOCK = 7420132
+
+SEQUENCE_MODELS = {
+    "author": Author,
+    "book": Book,
+    "borrow": Borrow,
+}
+
+
+async def reset_id_sequence(table: str, db: AsyncSession) -> int:
+    try:
+        model = SEQUENCE_MODELS[table]
+
+        await db.execute(text(f"LOCK TABLE {model.__tablename__} IN EXCLUSIVE MODE"))
+        result = await db.execute(
+            select(
+                func.setval(
+                    func.pg_get_serial_sequence(model.__tablename__, "id"),
+                    func.coalesce(func.max(model.id), 0) + 1,
+                    False,
+                )
+            )
+        )
+        next_id = result.scalar()
+        await db.commit()
+
+        return next_id
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def reconcile_author_counters(db: AsyncSession, batch_size: int) -> int:
+    repaired = 0
+    after = 0
+    while True:
+        try:
+            # Locking the batch first makes concurrent trigger updates either
+            # finish before the recount or wait until it is committed.
+            result = await db.execute(
+                select(Author.id)
+                .filter(Author.id > after)
+                .order_by(Author.id)
+                .limit(batch_size)
+                .with_for_update(key_share=True)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                await db.commit()
+                return repaired
+
+            books_count = (
+                select(func.count(Book.id)).filter(Book.author_id == Author.id).scalar_subquery()
+            )
+            result = await db.execute(
+                update(Author)
+                .where(Author.id.in_(ids), Author.books_count != books_count)
+                .values(books_count=books_count, version=Author.version + 1)
+                .returning(Author.id)
+            )
+            fixed = result.scalars().all()
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        for id in fixed:
+            await entity_cache.invalidate("author", id)
+        repaired += len(fixed)
+        after = ids[-1]
+
+
+async def reconcile_book_counters(db: AsyncSession, batch_size: int) -> int:
+    repaired = 0
+    after = 0
+    while True:
+        try:
+            result = await db.execute(
+                select(Book.id)
+                .filter(Book.id > after)
+                .order_by(Book.id)
+                .limit(batch_size)
+                .with_for_update(key_share=True)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                await db.commit()
+                return repaired
+
+            borrows_count = (
+                select(func.count(Borrow.id)).filter(Borrow.book_id == Book.id).scalar_subquery()
+            )
+            active_borrows_count = (
+                select(func.count(Borrow.id))
+                .filter(Borrow.book_id == Book.id, Borrow.is_return.is_(False))
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(Book)
+                .where(
+                    Book.id.in_(ids),
+                    or_(
+                        Book.borrows_count != borrows_count,
+                        Book.active_borrows_count != active_borrows_count,
+                    ),
+                )
+                .values(
+                    borrows_count=borrows_count,
+                    active_borrows_count=active_borrows_count,
+                    version=Book.version + 1,
+                )
+                .returning(Book.id)
+            )
+            fixed = result.scalars().all()
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        for id in fixed:
+            await entity_cache.invalidate("book", id)
+        repaired += len(fixed)
+        after = ids[-1]
+
+
+class ReconcileJob:
+    def __init__(self, id: str, batch_size: int):
+        self.id = id
+        self.batch_size = batch_size
+        self.state = "running"
+        self.repaired = {"author": None, "book": None}
+        self.error: Optional[str] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "batch_size": self.batch_size,
+            "state": self.state,
+            "repaired": self.repaired,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# Jobs live in the memory of the worker that started them; the ids are
+# random, so a status poll routed to another worker gets 404 rather than
+# somebody else's job.
+reconcile_jobs: OrderedDict[str, ReconcileJob] = OrderedDict()
+
+
+async def run_reconcile(job: ReconcileJob, session: async_sessionmaker) -> None:
+    try:
+        # The session-level advisory lock keeps other workers and instances
+        # from running a pass at the same time. It is held on a connection of
+        # its own in autocommit mode, so no transaction stays open, and it is
+        # released by the server if the worker dies.
+        async with session() as lock_db:
+            await lock_db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            locked = await lock_db.execute(select(func.pg_try_advisory_lock(RECONCILE_LOCK)))
+            if not locked.scalar():
+                job.state = "skipped"
+                return
+            try:
+                async with session() as db:
+                    job.repaired["author"] = await reconcile_author_counters(db, job.batch_size)
+                    job.repaired["book"] = await reconcile_book_counters(db, job.batch_size)
+            finally:
+                await lock_db.execute(select(func.pg_advisory_unlock(RECONCILE_LOCK)))
+        job.state = "done"
+    except asyncio.CancelledError:
+        job.state = "cancelled"
+        raise
+    except Exception as exc:
+        logger.exception("Counter reconcile failed")
+        job.state = "failed"
+        job.error = type(exc).__name__
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+
+
+def start_reconcile(batch_size: int, session: async_sessionmaker) -> ReconcileJob:
+    # One pass at a time: a second one would only recount the same rows.
+    for job in reconcile_jobs.values():
+        if job.state == "running":
+            return job
+
+    job = ReconcileJob(uuid4().hex, batch_size)
+    reconcile_jobs[job.id] = job
+    while len(reconcile_jobs) > PURGE_JOBS_KEPT:
+        reconcile_jobs.popitem(last=False)
+
+    run_in_background(run_reconcile(job, session))
+    return job
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import Select, delete
+from sqlalchemy.future import select
+from ..config import PURGE_CHUNK_SIZE, PURGE_JOBS_KEPT
+from ..cache import entity_cache
+from ..models import Book, Borrow
+from .author import delete_author
+from .book import delete_book
+
+logger = logging.getLogger(__name__)
+
+PURGE_DELETES = {
+    "author": delete_author,
+    "book": delete_book,
+}
+
+
+class PurgeJob:
+    def __init__(self, id: str, table: str, row_id: int):
+        self.id = id
+        self.table = table
+        self.row_id = row_id
+        self.state = "running"
+        self.deleted = {"borrow": 0, "book": 0, "author": 0}
+        self.error: Optional[str] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "table": self.table,
+            "row_id": self.row_id,
+            "state": self.state,
+            "deleted": self.deleted,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# Jobs live in the memory of the worker that started them, see
+# /maintenance/purges.
+purge_jobs: OrderedDict[str, PurgeJob] = OrderedDict()
+purge_tasks: set[asyncio.Task] = set()
+
+
+def get_purge_steps(table: str, id: int) -> list[tuple[str, Select]]:
+    # Children first, so the final DELETE of the row itself cascades to
+    # (almost) nothing and never holds locks on the whole subtree.
+    if table == "author":
+        return [
+            (
+                "borrow",
+                select(Borrow.id)
+                .join(Book, Book.id == Borrow.book_id)
+                .filter(Book.author_id == id),
+            ),
+            ("book", select(Book.id).filter(Book.author_id == id)),
+        ]
+    return [("borrow", select(Borrow.id).filter(Borrow.book_id == id))]
+
+
+async def delete_chunk(table: str, ids: Select, chunk_size: int, db: AsyncSession) -> int:
+    model = Borrow if table == "borrow" else Book
+    try:
+        result = await db.execute(
+            delete(model).where(model.id.in_(ids.limit(chunk_size).scalar_subquery()))
+        )
+        await db.commit()
+        return result.rowcount
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def run_purge(job: PurgeJob, session: async_sessionmaker, chunk_size: int) -> None:
+    try:
+        for table, ids in get_purge_steps(job.table, job.row_id):
+            while True:
+                async with session() as db:
+                    deleted = await delete_chunk(table, ids, chunk_size, db)
+                job.deleted[table] += deleted
+                await entity_cache.invalidate(table)
+                if deleted < chunk_size:
+                    break
+
+        async with session() as db:
+            if await PURGE_DELETES[job.table](job.row_id, db):
+                job.deleted[job.table] += 1
+        job.state = "done"
+    except asyncio.CancelledError:
+        job.state = "cancelled"
+        raise
+    except Exception as exc:
+        logger.exception("Purge of %s %s failed", job.table, job.row_id)
+        job.state = "failed"
+        job.error = type(exc).__name__
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+
+
+def start_purge(table: str, id: int, session: async_sessionmaker) -> PurgeJob:
+    job = PurgeJob(uuid4().hex, table, id)
+    purge_jobs[job.id] = job
+    while len(purge_jobs) > PURGE_JOBS_KEPT:
+        purge_jobs.popitem(last=False)
+
+    run_in_background(run_purge(job, session, PURGE_CHUNK_SIZE))
+    return job
+
+
+def run_in_background(coroutine) -> asyncio.Task:
+    # purge_tasks is what the lifespan shutdown waits for and cancels, so
+    # other maintenance jobs (counter reconcile) go through here as well.
+    task = asyncio.create_task(coroutine)
+    purge_tasks.add(task)
+    task.add_done_callback(purge_tasks.discard)
+    return task
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, Numeric, Table, and_, desc, func, or_, text
+from sqlalchemy.engine import Row
+from sqlalchemy.future import select
+from typing import Optional, Sequence
+from datetime import date, timedelta
+from ..config import LOAN_PERIOD_DAYS, STATS_REFRESH_SECONDS
+from ..models import Author, Book
+
+logger = logging.getLogger(__name__)
+
+STATS_REFRESH_LOCK = 7420131
+
+stats_metadata = MetaData()
+
+book_borrow_stats = Table(
+    "book_borrow_stats",
+    stats_metadata,
+    Column("book_id", Integer, primary_key=True),
+    Column("borrow_count", Integer),
+    Column("active_count", Integer),
+)
+
+author_borrow_stats = Table(
+    "author_borrow_stats",
+    stats_metadata,
+    Column("author_id", Integer, primary_key=True),
+    Column("borrow_count", Integer),
+    Column("active_count", Integer),
+)
+
+active_borrow_dates = Table(
+    "active_borrow_dates",
+    stats_metadata,
+    Column("borrow_date", Date),
+    Column("return_date", Date),
+    Column("active_count", Integer),
+)
+
+borrow_summary = Table(
+    "borrow_summary",
+    stats_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("borrow_count", Integer),
+    Column("active_count", Integer),
+    Column("returned_count", Integer),
+    Column("average_loan_days", Numeric),
+    Column("refreshed_at", DateTime(timezone=True)),
+)
+
+STATS_VIEWS = (book_borrow_stats, author_borrow_stats, active_borrow_dates, borrow_summary)
+
+
+def refreshed_at_column():
+    return select(borrow_summary.c.refreshed_at).scalar_subquery().label("refreshed_at")
+
+
+async def get_most_borrowed_books(db: AsyncSession, limit: int) -> Sequence[Row]:
+    # Ranking the first rows after the LIMIT gives the same ranks as ranking
+    # every book, and lets the index on borrow_count stop the scan early.
+    top = (
+        select(
+            book_borrow_stats.c.book_id,
+            Book.title,
+            book_borrow_stats.c.borrow_count,
+            book_borrow_stats.c.active_count,
+        )
+        .join(Book, Book.id == book_borrow_stats.c.book_id)
+        .order_by(desc(book_borrow_stats.c.borrow_count), book_borrow_stats.c.book_id)
+        .limit(limit)
+        .subquery("top")
+    )
+    result = await db.execute(
+        select(
+            func.rank().over(order_by=desc(top.c.borrow_count)).label("rank"),
+            top,
+            refreshed_at_column(),
+        ).order_by(desc(top.c.borrow_count), top.c.book_id)
+    )
+    return result.all()
+
+
+async def get_authors_active_borrows(db: AsyncSession, limit: int) -> Sequence[Row]:
+    top = (
+        select(
+            author_borrow_stats.c.author_id,
+            Author.name,
+            Author.surname,
+            author_borrow_stats.c.active_count,
+            author_borrow_stats.c.borrow_count,
+        )
+        .join(Author, Author.id == author_borrow_stats.c.author_id)
+        .order_by(desc(author_borrow_stats.c.active_count), author_borrow_stats.c.author_id)
+        .limit(limit)
+        .subquery("top")
+    )
+    result = await db.execute(
+        select(
+            func.rank().over(order_by=desc(top.c.active_count)).label("rank"),
+            top,
+            refreshed_at_column(),
+        ).order_by(desc(top.c.active_count), top.c.author_id)
+    )
+    return result.all()
+
+
+async def get_borrow_stats(db: AsyncSession, today: date) -> Optional[Row]:
+    due_before = today - timedelta(days=LOAN_PERIOD_DAYS)
+    overdue = (
+        select(func.coalesce(func.sum(active_borrow_dates.c.active_count), 0))
+        .where(
+            or_(
+                active_borrow_dates.c.return_date < today,
+                and_(
+                    active_borrow_dates.c.return_date.is_(None),
+                    active_borrow_dates.c.borrow_date < due_before,
+                ),
+            )
+        )
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            borrow_summary.c.borrow_count,
+            borrow_summary.c.active_count,
+            borrow_summary.c.returned_count,
+            overdue.label("overdue_count"),
+            func.round(borrow_summary.c.average_loan_days, 2).label("average_loan_days"),
+            borrow_summary.c.refreshed_at,
+        )
+    )
+    return result.first()
+
+
+async def refresh_stats(db: AsyncSession, max_age: Optional[float] = None) -> bool:
+    try:
+        locked = await db.execute(select(func.pg_try_advisory_xact_lock(STATS_REFRESH_LOCK)))
+        if not locked.scalar():
+            await db.rollback()
+            return False
+
+        if max_age is not None:
+            # Read under the lock: another worker may have just finished a
+            # refresh, and the views are still that fresh.
+            fresh = await db.execute(
+                select(borrow_summary.c.refreshed_at > func.now() - timedelta(seconds=max_age))
+            )
+            if fresh.scalar():
+                await db.rollback()
+                return False
+
+        for view in STATS_VIEWS:
+            await db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
+        await db.commit()
+
+        return True
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def refresh_stats_periodically(session: async_sessionmaker) -> None:
+    while True:
+        await asyncio.sleep(STATS_REFRESH_SECONDS)
+        try:
+            async with session() as db:
+                await refresh_stats(db, max_age=STATS_REFRESH_SECONDS)
+        except Exception:
+            logger.exception("Stats refresh failed")
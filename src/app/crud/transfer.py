@@ -0,0 +1,188 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, column, func, literal, or_, table, text, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from typing import AsyncGenerator, AsyncIterable, Union
+from asyncpg.exceptions import DataError
+from ..config import COPY_BUFFER_CHUNKS
+from ..cache import entity_cache
+from ..database import get_driver_connection
+from ..models import Author, Book, Borrow
+from sqlalchemy.future import select
+import asyncio
+
+TRANSFER_MODELS = {
+    "author": Author,
+    "book": Book,
+    "borrow": Borrow,
+}
+
+TRANSFER_PARENTS = {
+    "book": ("author_id", Author),
+    "borrow": ("book_id", Book),
+}
+
+
+def get_transfer_columns(name: str) -> list[str]:
+    return [
+        column.key
+        for column in TRANSFER_MODELS[name].__table__.c
+        if column.computed is None and not column.info.get("counter")
+    ]
+
+
+async def copy_table_to_csv(
+    name: str, db: AsyncSession
+) -> AsyncGenerator[bytes, None]:
+    driver_connection = await get_driver_connection(db)
+    chunks = asyncio.Queue(maxsize=COPY_BUFFER_CHUNKS)
+
+    async def write(data: bytes) -> None:
+        await chunks.put(bytes(data))
+
+    async def copy() -> None:
+        try:
+            await driver_connection.copy_from_table(
+                name,
+                columns=get_transfer_columns(name),
+                output=write,
+                format="csv",
+                header=True,
+            )
+        finally:
+            await chunks.put(None)
+
+    task = asyncio.create_task(copy())
+    try:
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def count_staged_borrows(staging, db: AsyncSession) -> None:
+    # Borrows have no insert or update counter triggers, so the load moves
+    # the book counters itself: each staged row counts, the row it replaces
+    # no longer does, and unchanged rows cancel out.
+    rows = union_all(
+        select(
+            staging.c.book_id,
+            literal(1).label("delta"),
+            case((staging.c.is_return, 0), else_=1).label("active_delta"),
+        ),
+        select(
+            Borrow.book_id,
+            literal(-1),
+            case((Borrow.is_return, 0), else_=-1),
+        ).join(staging, Borrow.id == staging.c.id),
+    ).subquery("rows")
+    changes = (
+        select(
+            rows.c.book_id,
+            func.sum(rows.c.delta).label("delta"),
+            func.sum(rows.c.active_delta).label("active_delta"),
+        )
+        .group_by(rows.c.book_id)
+        .having(or_(func.sum(rows.c.delta) != 0, func.sum(rows.c.active_delta) != 0))
+        .subquery("changes")
+    )
+    await db.execute(
+        update(Book)
+        .where(Book.id == changes.c.book_id)
+        .values(
+            borrows_count=Book.borrows_count + changes.c.delta,
+            active_borrows_count=Book.active_borrows_count + changes.c.active_delta,
+            version=Book.version + 1,
+        )
+    )
+
+
+async def copy_csv_to_table(
+    name: str, source: AsyncIterable[bytes], db: AsyncSession
+) -> Union[int, str]:
+    try:
+        model = TRANSFER_MODELS[name]
+        columns = get_transfer_columns(name)
+        staging_name = f"staging_{name}"
+        staging = table(staging_name, *[column(key) for key in columns])
+
+        await db.execute(
+            text(
+                f"CREATE TEMP TABLE {staging_name} ON COMMIT DROP AS "
+                f"SELECT {', '.join(columns)} FROM {name} WITH NO DATA"
+            )
+        )
+        driver_connection = await get_driver_connection(db)
+        try:
+            await driver_connection.copy_to_table(
+                staging_name, source=source, columns=columns, format="csv", header=True
+            )
+        except DataError:
+            await db.rollback()
+            return "Invalid csv"
+
+        required = [
+            staging.c[column.key]
+            for column in model.__table__.c
+            if column.key in columns and not column.nullable
+        ]
+        result = await db.execute(
+            select(
+                func.count(),
+                func.count().filter(func.num_nulls(*required) > 0),
+                func.count(staging.c.id) - func.count(staging.c.id.distinct()),
+            ).select_from(staging)
+        )
+        rows, incomplete, duplicates = result.one()
+        if incomplete:
+            await db.rollback()
+            return "Missing value"
+        if duplicates:
+            await db.rollback()
+            return "Duplicate id"
+
+        if name in TRANSFER_PARENTS:
+            key, parent = TRANSFER_PARENTS[name]
+            orphans = select(staging.c[key]).where(
+                ~select(parent.id).where(parent.id == staging.c[key]).exists()
+            )
+            result = await db.execute(select(orphans.exists()))
+            if result.scalar():
+                await db.rollback()
+                return "Missing parent"
+
+        if name == "borrow":
+            await count_staged_borrows(staging, db)
+
+        statement = insert(model).from_select(
+            columns, select(*[staging.c[key] for key in columns])
+        )
+        changed = [key for key in columns if key not in ("id", "version")]
+        statement = statement.on_conflict_do_update(
+            index_elements=[model.id],
+            set_={
+                **{key: statement.excluded[key] for key in changed},
+                "version": model.version + 1,
+            },
+            where=tuple_(*[model.__table__.c[key] for key in changed]).is_distinct_from(
+                tuple_(*[statement.excluded[key] for key in changed])
+            ),
+        )
+        await db.execute(statement)
+        await db.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), max(id)) "
+                f"FROM {staging_name} HAVING max(id) > coalesce("
+                f"pg_sequence_last_value(pg_get_serial_sequence('{name}', 'id')::regclass), 0)"
+            )
+        )
+        await db.commit()
+        await entity_cache.invalidate(name)
+        if name in TRANSFER_PARENTS:
+            await entity_cache.invalidate(TRANSFER_PARENTS[name][1].__tablename__)
+
+        return rows
+    except Exception:
+        await db.rollback()
+        raise
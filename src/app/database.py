@@ -1,11 +1,336 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
-from typing import AsyncGenerator
-from app.config import DATABASE_URL
+import asyncio
+from collections import defaultdict
+from contextlib import AsyncExitStack, contextmanager
+from contextvars import ContextVar
+from itertools import count
+from fastapi import Request
+from sqlalchemy import event, exc, make_url
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,
+    create_async_engine,
+    AsyncEngine,
+    AsyncSession,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Executable
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Iterator, Optional, Sequence
+from time import perf_counter, time
+from uuid import uuid4
+from app.config import (
+    CACHE_ENABLED,
+    CACHE_INVALIDATION_CHANNEL,
+    DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DB_ECHO,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_REPLICA_SELECTION,
+    DB_READ_YOUR_WRITES_SECONDS,
+)
 
-engine = create_async_engine(url=DATABASE_URL, echo=True)
-async_session = async_sessionmaker(bind=engine, class_=AsyncSession)
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        started = perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            waited = perf_counter() - started
+            self.wait_stats.checkouts += 1
+            self.wait_stats.wait_seconds += waited
+            self.wait_stats.max_wait_seconds = max(self.wait_stats.max_wait_seconds, waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class QueryStats:
+    def __init__(self, parent: Optional["QueryStats"] = None, keep_statements: bool = False):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Optional[list[str]] = [] if keep_statements else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            if seconds >= stats.slowest_seconds:
+                stats.slowest_seconds = seconds
+                stats.slowest_statement = statement
+            if stats.statements is not None:
+                stats.statements.append(statement)
+            stats = stats.parent
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@contextmanager
+def track_queries(keep_statements: bool = False) -> Iterator[QueryStats]:
+    stats = QueryStats(current_query_stats.get(), keep_statements)
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    with track_queries(keep_statements=True) as stats:
+        yield stats
+    if stats.count > limit:
+        statements = "\n".join(
+            f"{number}. {statement}" for number, statement in enumerate(stats.statements, 1)
+        )
+        raise AssertionError(
+            f"{stats.count} queries executed, expected at most {limit}:\n{statements}"
+        )
+
+
+class StatementCacheStats:
+    def __init__(self):
+        # SQLAlchemy compiled cache: hit, miss, caching_disabled, no_cache_key, ...
+        self.compiled: defaultdict[str, int] = defaultdict(int)
+        # asyncpg prepared statements kept per connection by the dialect.
+        self.prepared: defaultdict[str, int] = defaultdict(int)
+
+    def as_dict(self) -> dict:
+        return {
+            "compiled": {**self.compiled, "hit_rate": get_hit_rate(self.compiled)},
+            "prepared": {**self.prepared, "hit_rate": get_hit_rate(self.prepared)},
+        }
+
+
+def get_hit_rate(counts: dict[str, int]) -> Optional[float]:
+    total = sum(counts.values())
+    return round(counts["hit"] / total, 4) if total else None
+
+
+statement_cache_stats = StatementCacheStats()
+
+
+def prepared_statement_name() -> str:
+    # Unique names keep statements apart when connections are multiplexed
+    # (pgbouncer), and make them easy to spot in pg_prepared_statements.
+    return f"__library_{uuid4().hex}__"
+
+
+def get_primary_server_settings() -> dict[str, str]:
+    # The notify_entity_cache triggers NOTIFY this channel from every write
+    # made on the connection, so the workers drop their cached copies.
+    if CACHE_ENABLED and CACHE_INVALIDATION_CHANNEL:
+        return {"library.cache_channel": CACHE_INVALIDATION_CHANNEL}
+    return {}
+
+
+def get_connect_args(url: str, server_settings: Optional[dict[str, str]] = None) -> dict:
+    if make_url(url).get_driver_name() != "asyncpg":
+        return {}
+    connect_args = {
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_name_func": prepared_statement_name,
+    }
+    if server_settings:
+        connect_args["server_settings"] = server_settings
+    return connect_args
+
+
+def get_pool_status(pool: MeasuredQueuePool) -> dict:
+    stats = pool.wait_stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_seconds_total": round(stats.wait_seconds, 6),
+        "wait_seconds_avg": round(stats.wait_seconds / stats.checkouts, 6) if stats.checkouts else 0.0,
+        "wait_seconds_max": round(stats.max_wait_seconds, 6),
+    }
+
+
+def create_engine_for(url: str, server_settings: Optional[dict[str, str]] = None) -> AsyncEngine:
+    return create_async_engine(
+        url=url,
+        echo=DB_ECHO,
+        poolclass=MeasuredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=get_connect_args(url, server_settings),
+    )
+
+
+class ReplicaSelector:
+    def __init__(self, engines: list[AsyncEngine], strategy: str):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.engines = engines
+        self.sessions = [async_sessionmaker(bind=engine, class_=AsyncSession) for engine in engines]
+        self.strategy = strategy
+        self.counter = count()
+
+    def choose(self) -> async_sessionmaker:
+        start = next(self.counter) % len(self.sessions)
+        if self.strategy == "least_connections":
+            order = [(start + offset) % len(self.engines) for offset in range(len(self.engines))]
+            start = min(order, key=lambda index: self.engines[index].pool.checkedout())
+        return self.sessions[start]
+
+
+class WriteState:
+    def __init__(self):
+        self.committed = False
+
+
+class WriteSession(Session):
+    pass
+
+
+current_write_state: ContextVar[Optional[WriteState]] = ContextVar(
+    "current_write_state", default=None
+)
+
+
+@event.listens_for(WriteSession, "after_commit")
+def mark_committed(session):
+    state = current_write_state.get()
+    if state is not None:
+        state.committed = True
+
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats.get() is not None:
+        context.query_started = perf_counter()
+
+
+def count_statement_cache(conn, cursor, statement, parameters, context, executemany):
+    statement_cache_stats.compiled[context.cache_hit.name.lower().removeprefix("cache_")] += 1
+
+    adapt_connection = getattr(cursor, "_adapt_connection", None)
+    prepared = getattr(adapt_connection, "_prepared_statement_cache", None)
+    if prepared is not None and not executemany:
+        statement_cache_stats.prepared["hit" if statement in prepared else "miss"] += 1
+
+
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    started = getattr(context, "query_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, perf_counter() - started)
+
+
+def stop_failed_query_timer(exception_context):
+    context = exception_context.execution_context
+    stats = current_query_stats.get()
+    started = getattr(context, "query_started", None)
+    if stats is not None and started is not None:
+        stats.record(exception_context.statement, perf_counter() - started)
+
+
+engine = create_engine_for(DATABASE_URL, get_primary_server_settings())
+replica_engines = [create_engine_for(url) for url in DATABASE_REPLICA_URLS]
+
+for instrumented in (engine, *replica_engines):
+    event.listen(instrumented.sync_engine, "before_cursor_execute", start_query_timer)
+    event.listen(instrumented.sync_engine, "before_cursor_execute", count_statement_cache)
+    event.listen(instrumented.sync_engine, "after_cursor_execute", stop_query_timer)
+    event.listen(instrumented.sync_engine, "handle_error", stop_failed_query_timer)
+
+async_session = async_sessionmaker(
+    bind=engine, class_=AsyncSession, sync_session_class=WriteSession
+)
+replica_selector = (
+    ReplicaSelector(replica_engines, DB_REPLICA_SELECTION) if replica_engines else None
+)
+
+
+async def prime_session(db: AsyncSession, statements: Sequence[tuple[Executable, dict]]) -> None:
+    await db.connection()
+    for statement, parameters in statements:
+        await db.execute(statement, parameters)
+
+
+async def warm_up_pool(
+    session: async_sessionmaker,
+    connections: int,
+    statements: Sequence[tuple[Executable, dict]] = (),
+) -> None:
+    # All sessions stay open until every one has run, so each holds its own
+    # connection: the pool ends up with `connections` open connections and
+    # each of them has the statements prepared.
+    async with AsyncExitStack() as stack:
+        sessions = [await stack.enter_async_context(session()) for _ in range(connections)]
+        await asyncio.gather(*(prime_session(db, statements) for db in sessions))
+
+
+def reads_own_writes(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > time()
+    except ValueError:
+        return False
+
+
+def get_read_session(request: Request) -> async_sessionmaker:
+    if replica_selector is None or reads_own_writes(request):
+        return async_session
+    return replica_selector.choose()
+
+
+def primary_until_cookie() -> str:
+    return (
+        f"{PRIMARY_UNTIL_COOKIE}={time() + DB_READ_YOUR_WRITES_SECONDS:.3f}; "
+        f"Max-Age={int(DB_READ_YOUR_WRITES_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax"
+    )
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with get_read_session(request)() as session:
+        yield session
+
+
+async def get_driver_connection(db: AsyncSession):
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection
@@ -0,0 +1,41 @@
+from fastapi import Response, status
+from hashlib import blake2b
+from typing import Iterable, Optional
+
+
+def make_etag(id: int, version: int) -> str:
+    return f'"{id}-{version}"'
+
+
+def make_page_etag(rows: Iterable[tuple[int, int]], next_cursor: Optional[int]) -> str:
+    digest = blake2b(digest_size=16)
+    for id, version in rows:
+        digest.update(f"{id}-{version};".encode())
+    digest.update(f"next:{next_cursor}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def parse_if_match(if_match: Optional[str], id: int) -> Optional[list[int]]:
+    # None means "no precondition"; an empty list never matches (weak and
+    # foreign tags are ignored, If-Match uses strong comparison).
+    if not if_match or if_match.strip() == "*":
+        return None
+
+    versions = []
+    for tag in if_match.split(","):
+        tag_id, _, version = tag.strip().removeprefix('"').removesuffix('"').partition("-")
+        if tag_id == str(id) and version.isdigit():
+            versions.append(int(version))
+    return versions
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import signal
+import threading
+from typing import Optional
+from sqlalchemy import URL, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from .config import HEALTH_CHECK_TIMEOUT
+from .crud.purge import purge_tasks
+from .database import engine, replica_engines
+
+logger = logging.getLogger(__name__)
+
+
+class HealthState:
+    def __init__(self):
+        self.started = False
+        self.draining = False
+        self.warmup_seconds: Optional[float] = None
+
+
+def create_probe_engine(url: URL) -> AsyncEngine:
+    # One connection of its own: a probe neither queues behind requests on a
+    # saturated pool nor takes a connection from them, and a concurrent probe
+    # waits for it no longer than HEALTH_CHECK_TIMEOUT.
+    return create_async_engine(
+        url, pool_size=1, max_overflow=0, pool_timeout=HEALTH_CHECK_TIMEOUT
+    )
+
+
+async def ping(probe: AsyncEngine) -> bool:
+    async def select_one() -> None:
+        async with probe.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(select_one(), HEALTH_CHECK_TIMEOUT)
+        return True
+    except Exception:
+        logger.warning("Health check of %s failed", probe.url.render_as_string(), exc_info=True)
+        return False
+
+
+def install_drain_signal_handler(delay: float) -> None:
+    """Flip /health/ready to 503 on SIGTERM before uvicorn starts stopping.
+
+    uvicorn closes its listeners as soon as it gets SIGTERM and runs the
+    lifespan shutdown only after the open connections finish, so flipping
+    readiness there is too late for a load balancer to notice. This wraps the
+    handler uvicorn installed before the lifespan startup: the signal marks
+    the worker as draining at once and is passed on to uvicorn `delay`
+    seconds later, while requests are still being served. A second SIGTERM
+    is passed on immediately.
+    """
+    # Signal handlers can only be set from the main thread, as in uvicorn.
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return
+
+    loop = asyncio.get_running_loop()
+
+    def handle_sigterm(signum, frame) -> None:
+        if health_state.draining or delay <= 0:
+            health_state.draining = True
+            previous(signum, frame)
+            return
+        health_state.draining = True
+        logger.info("SIGTERM received, stopping in %s seconds", delay)
+        loop.call_soon_threadsafe(loop.call_later, delay, previous, signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+async def drain(seconds: float) -> None:
+    # Requests are drained by uvicorn before the lifespan shutdown runs
+    # (--timeout-graceful-shutdown); what is left are background purges.
+    if not purge_tasks:
+        return
+    await asyncio.wait(list(purge_tasks), timeout=seconds)
+    if purge_tasks:
+        logger.warning("Drain timed out: %s purges running", len(purge_tasks))
+
+
+health_state = HealthState()
+primary_probe = create_probe_engine(engine.url)
+replica_probes = [create_probe_engine(replica.url) for replica in replica_engines]
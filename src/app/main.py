@@ -1,10 +1,98 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from time import perf_counter
 from fastapi import FastAPI, HTTPException, status
 from fastapi.responses import JSONResponse
 from .routers.author_routers import author_router
 from .routers.book_routers import book_router
 from .routers.borrow_routers import borrow_router
+from .routers.maintenance_routers import maintenance_router
+from .routers.transfer_routers import transfer_router
+from .routers.debug_routers import debug_router
+from .routers.metrics_routers import metrics_router
+from .routers.stats_routers import stats_router
+from .routers.health_routers import health_router
+from .crud.author import GET_AUTHOR
+from .crud.book import GET_BOOK
+from .crud.borrow import GET_BORROW
+from .crud.stats import refresh_stats_periodically
+from .crud.purge import purge_tasks
+from .cache import cache_invalidation
+from .config import (
+    DB_POOL_SIZE,
+    DB_WARMUP_CONNECTIONS,
+    SHUTDOWN_DELAY_SECONDS,
+    SHUTDOWN_DRAIN_SECONDS,
+    STATS_REFRESH_SECONDS,
+)
+from .database import async_session, engine, replica_engines, replica_selector, warm_up_pool
+from .health import (
+    drain,
+    health_state,
+    install_drain_signal_handler,
+    primary_probe,
+    replica_probes,
+)
+from .metrics import MetricsMiddleware, request_metrics
+from .consistency import ReadYourWritesMiddleware
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Executed on every warmed-up connection with a missing id, so the hot lookups
+# are compiled and prepared before the first request.
+WARMUP_STATEMENTS = (
+    (GET_AUTHOR, {"id": 0}),
+    (GET_BOOK, {"id": 0}),
+    (GET_BORROW, {"id": 0}),
+)
+
+
+async def warm_up() -> None:
+    connections = min(DB_WARMUP_CONNECTIONS, DB_POOL_SIZE)
+    if connections <= 0:
+        return
+
+    started = perf_counter()
+    sessions = [async_session, *(replica_selector.sessions if replica_selector else ())]
+    try:
+        await asyncio.gather(
+            *(warm_up_pool(session, connections, WARMUP_STATEMENTS) for session in sessions)
+        )
+    except Exception:
+        # The worker still starts; /health/ready reports the database state.
+        logger.exception("Connection pool warm-up failed")
+    else:
+        health_state.warmup_seconds = round(perf_counter() - started, 6)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    health_state.started = True
+    install_drain_signal_handler(SHUTDOWN_DELAY_SECONDS)
+    background = []
+    if STATS_REFRESH_SECONDS > 0:
+        background.append(asyncio.create_task(refresh_stats_periodically(async_session)))
+    if cache_invalidation is not None:
+        background.append(asyncio.create_task(cache_invalidation.run()))
+    yield
+    health_state.draining = True
+    await drain(SHUTDOWN_DRAIN_SECONDS)
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    for task in list(purge_tasks):
+        task.cancel()
+    await asyncio.gather(*purge_tasks, return_exceptions=True)
+    for disposed in (engine, *replica_engines, primary_probe, *replica_probes):
+        await disposed.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(HTTPException)
@@ -14,6 +102,7 @@ async def http_exception_handler(request, exc: HTTPException):
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc: Exception):
+    request_metrics.observe_unhandled_error(request.scope, exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "Внутренняя ошибка сервера"},
@@ -23,3 +112,11 @@ async def global_exception_handler(request, exc: Exception):
 app.include_router(author_router, prefix="/api_library/authors", tags=["authors"])
 app.include_router(book_router, prefix="/api_library/books", tags=["books"])
 app.include_router(borrow_router, prefix="/api_library/borrows", tags=["borrows"])
+app.include_router(
+    maintenance_router, prefix="/api_library/maintenance", tags=["maintenance"]
+)
+app.include_router(transfer_router, prefix="/api_library/transfer", tags=["transfer"])
+app.include_router(stats_router, prefix="/api_library/stats", tags=["stats"])
+app.include_router(debug_router, prefix="/debug", tags=["debug"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(health_router, prefix="/health", tags=["health"])
@@ -0,0 +1,188 @@
+from bisect import bisect_left
+from collections import defaultdict
+from time import perf_counter
+from typing import Iterable
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .database import QueryStats, statement_cache_stats, track_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RequestMetrics:
+    # Updated only from the event loop thread, so plain dicts and ints are enough.
+    def __init__(self):
+        self.requests: defaultdict[tuple[str, str, int], int] = defaultdict(int)
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.response_size: dict[tuple[str, str], Histogram] = {}
+        self.db_queries: dict[tuple[str, str], Histogram] = {}
+        self.db_duration: dict[tuple[str, str], Histogram] = {}
+        self.unhandled_errors: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+        self.in_flight = 0
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float, size: int, queries: QueryStats
+    ) -> None:
+        self.requests[(method, route, status)] += 1
+
+        key = (method, route)
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.response_size[key] = Histogram(SIZE_BUCKETS)
+            self.db_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self.db_duration[key] = Histogram(LATENCY_BUCKETS)
+        latency.observe(seconds)
+        self.response_size[key].observe(size)
+        self.db_queries[key].observe(queries.count)
+        self.db_duration[key].observe(queries.seconds)
+
+    def observe_unhandled_error(self, scope: Scope, exc: Exception) -> None:
+        self.unhandled_errors[(scope["method"], get_route(scope), type(exc).__name__)] += 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total Completed HTTP requests.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(
+                f"http_requests_total{format_labels(method=method, route=route, status=status)} {count}"
+            )
+
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests being processed.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_unhandled_errors_total Requests answered with 500 by the global exception handler.",
+            "# TYPE http_unhandled_errors_total counter",
+        ]
+        for (method, route, exception), count in sorted(self.unhandled_errors.items()):
+            lines.append(
+                f"http_unhandled_errors_total"
+                f"{format_labels(method=method, route=route, exception=exception)} {count}"
+            )
+
+        lines += [
+            "# HELP db_statement_cache_total SQL statement executions by statement cache result.",
+            "# TYPE db_statement_cache_total counter",
+        ]
+        for cache, counts in (
+            ("compiled", statement_cache_stats.compiled),
+            ("prepared", statement_cache_stats.prepared),
+        ):
+            for result, count in sorted(counts.items()):
+                lines.append(
+                    f"db_statement_cache_total{format_labels(cache=cache, result=result)} {count}"
+                )
+
+        lines += render_histograms(
+            "http_request_duration_seconds", "HTTP request latency.", self.latency
+        )
+        lines += render_histograms(
+            "http_response_size_bytes", "HTTP response body size.", self.response_size
+        )
+        lines += render_histograms(
+            "db_queries_per_request", "SQL statements executed per HTTP request.", self.db_queries
+        )
+        lines += render_histograms(
+            "db_duration_seconds", "Time spent in SQL statements per HTTP request.", self.db_duration
+        )
+        return "\n".join(lines) + "\n"
+
+
+def get_route(scope: Scope) -> str:
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+def format_server_timing(queries: QueryStats) -> str:
+    return (
+        f'db;dur={queries.seconds * 1000:.3f};desc="{queries.count} queries", '
+        f"db-slowest;dur={queries.slowest_seconds * 1000:.3f}"
+    )
+
+
+def escape_label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_histograms(
+    name: str, description: str, histograms: dict[tuple[str, str], Histogram]
+) -> Iterable[str]:
+    yield f"# HELP {name} {description}"
+    yield f"# TYPE {name} histogram"
+    for (method, route), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            labels = format_labels(method=method, route=route, le=bound)
+            yield f"{name}_bucket{labels} {cumulative}"
+        cumulative += histogram.counts[-1]
+        labels = format_labels(method=method, route=route, le="+Inf")
+        yield f"{name}_bucket{labels} {cumulative}"
+        labels = format_labels(method=method, route=route)
+        yield f"{name}_sum{labels} {histogram.sum}"
+        yield f"{name}_count{labels} {cumulative}"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = request_metrics
+        status = 500
+        size = 0
+
+        async def send_measured(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", format_server_timing(queries))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        started = perf_counter()
+        with track_queries() as queries:
+            try:
+                await self.app(scope, receive, send_measured)
+            finally:
+                metrics.in_flight -= 1
+                metrics.observe(
+                    scope["method"],
+                    get_route(scope),
+                    status,
+                    perf_counter() - started,
+                    size,
+                    queries,
+                )
+
+
+request_metrics = RequestMetrics()
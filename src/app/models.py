@@ -1,4 +1,5 @@
-from sqlalchemy import String, Text, ForeignKey, Integer
+from sqlalchemy import Computed, String, Text, ForeignKey, Index, Integer, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from datetime import date
 
@@ -9,17 +10,29 @@ class Base(DeclarativeBase):
 
 class Author(Base):
     __tablename__ = "author"
+    __table_args__ = (
+        Index("ix_author_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_author_surname_trgm", "surname", postgresql_using="gin", postgresql_ops={"surname": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(20), nullable=False)
     surname: Mapped[str] = mapped_column(String(20), nullable=False)
     date_of_birth: Mapped[date] = mapped_column(nullable=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    books_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", info={"counter": True}
+    )
 
-    books: Mapped[list["Book"]] = relationship("Book", back_populates="author", cascade="all, delete-orphan")
+    books: Mapped[list["Book"]] = relationship("Book", back_populates="author", cascade="all, delete-orphan", passive_deletes=True, order_by="Book.id")
 
 
 class Book(Base):
     __tablename__ = "book"
+    __table_args__ = (
+        Index("ix_book_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_book_author_id_id", "author_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(20), nullable=False)
@@ -28,13 +41,40 @@ class Book(Base):
         ForeignKey("author.id", ondelete="CASCADE"), nullable=False
     )
     available_copies: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    borrows_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", info={"counter": True}
+    )
+    active_borrows_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", info={"counter": True}
+    )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     author: Mapped["Author"] = relationship(back_populates="books")
-    borrows: Mapped[list["Borrow"]] = relationship("Borrow", back_populates="book", cascade="all, delete-orphan")
+    borrows: Mapped[list["Borrow"]] = relationship("Borrow", back_populates="book", cascade="all, delete-orphan", passive_deletes=True, order_by="Borrow.id")
 
 
 class Borrow(Base):
     __tablename__ = "borrow"
+    __table_args__ = (
+        Index("ix_borrow_active_id", "id", postgresql_where=text("is_return = false")),
+        Index("ix_borrow_book_id_id", "book_id", "id"),
+        Index("ix_borrow_reader_name_id", "reader_name", "id"),
+        Index(
+            "ix_borrow_active_reader_name_id",
+            "reader_name",
+            "id",
+            postgresql_where=text("is_return = false"),
+        ),
+        Index("ix_borrow_borrow_date_id", "borrow_date", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     book_id: Mapped[int] = mapped_column(
@@ -44,5 +84,6 @@ class Borrow(Base):
     borrow_date: Mapped[date] = mapped_column(nullable=False)
     return_date: Mapped[date] = mapped_column(nullable=True)
     is_return: Mapped[bool] = mapped_column(default=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     book: Mapped["Book"] = relationship("Book", back_populates="borrows")
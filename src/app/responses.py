@@ -0,0 +1,8 @@
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class ModelJSONResponse(JSONResponse):
+    def render(self, content: BaseModel) -> bytes:
+        return to_json(content)
@@ -1,15 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from ..database import get_db
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from ..database import async_session, get_db, get_read_db, get_read_session
 from ..crud.author import (
     get_all_authors,
+    get_all_authors_versions,
     get_author,
     update_author,
+    patch_author,
     delete_author,
     create_author,
+    create_authors,
+    stream_authors,
+    search_authors,
+    get_author_with_books,
+)
+from ..crud.book import get_all_books
+from typing import Annotated, AsyncGenerator, Literal, Optional, Union
+from itertools import chain
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from ..config import BATCH_SIZE_MAX, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, SEARCH_OFFSET_MAX
+from ..crud.purge import start_purge
+from ..etag import etag_matches, make_etag, make_page_etag, not_modified, parse_if_match
+from ..responses import ModelJSONResponse
+from ..schemes import (
+    AuthorScheme,
+    AuthorBatchItemScheme,
+    AuthorBatchScheme,
+    AuthorCreateScheme,
+    AuthorPageScheme,
+    AuthorSearchPageScheme,
+    AuthorUpdateScheme,
+    AuthorWithBooksScheme,
+    AuthorWithBooksPageScheme,
+    BookPageScheme,
 )
-from typing import Annotated
-from sqlalchemy.ext.asyncio import AsyncSession
-from ..schemes import AuthorScheme
 from datetime import date
 
 author_router = APIRouter()
@@ -32,64 +56,244 @@ async def api_create_author(
         name=name, surname=surname, date_of_birth=date_of_birth, db=db
     )
 
-    return AuthorScheme(
-            id=author.id,
-            name=author.name,
-            surname=author.surname,
-            date_of_birth=author.date_of_birth,
+    return ModelJSONResponse(AuthorScheme.model_validate(author))
+
+
+@author_router.post(
+    "/batch",
+    response_model=AuthorBatchScheme,
+    responses={
+        500: {"description": "Внутренняя ошибка сервера"},
+    },
+)
+async def api_create_authors(
+    authors: Annotated[
+        list[AuthorCreateScheme], Body(min_length=1, max_length=BATCH_SIZE_MAX)
+    ],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    new_authors = await create_authors(authors=authors, db=db)
+
+    return ModelJSONResponse(
+        AuthorBatchScheme(
+            items=[
+                AuthorBatchItemScheme(
+                    index=index,
+                    item=AuthorScheme.model_validate(author._mapping),
+                    detail=None,
+                )
+                for index, author in enumerate(new_authors)
+            ]
         )
+    )
 
 
 @author_router.get(
     "/",
-    response_model=list[AuthorScheme],
+    response_model=Union[AuthorWithBooksPageScheme, AuthorPageScheme],
     responses={
         404: {"description": "Авторы не найдены."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
-async def api_get_all_authors(db: Annotated[AsyncSession, Depends(get_db)]):
-    authors = await get_all_authors(db)
-    if not authors:
+async def api_get_all_authors(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    after: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+    include: Optional[Literal["books"]] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    if if_none_match and not include:
+        versions = await get_all_authors_versions(db, after=after, limit=limit)
+        if versions:
+            etag = make_page_etag(*versions)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    page = await get_all_authors(
+        db, after=after, limit=limit, include_books=include == "books"
+    )
+    if not page:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Авторы не найдены."
         )
-    
-    authors_response = [
-        AuthorScheme(
-            id=author.id,
-            name=author.name,
-            surname=author.surname,
-            date_of_birth=author.date_of_birth,
+
+    authors, next_cursor = page
+    if include == "books":
+        etag = make_page_etag(
+            chain.from_iterable(
+                chain([(author.id, author.version)], ((book.id, book.version) for book in author.books))
+                for author in authors
+            ),
+            next_cursor,
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        return ModelJSONResponse(
+            AuthorWithBooksPageScheme.model_validate(
+                {"items": authors, "next_cursor": next_cursor}
+            ),
+            headers={"ETag": etag},
+        )
+
+    etag = make_page_etag(((author.id, author.version) for author in authors), next_cursor)
+    return ModelJSONResponse(
+        AuthorPageScheme.model_validate(
+            {"items": [author._mapping for author in authors], "next_cursor": next_cursor}
+        ),
+        headers={"ETag": etag},
+    )
+
+
+async def authors_ndjson(session: async_sessionmaker) -> AsyncGenerator[str, None]:
+    async with session() as db:
+        async for authors in stream_authors(db):
+            yield "".join(
+                AuthorScheme.model_validate(author._mapping).model_dump_json() + "\n"
+                for author in authors
+            )
+
+
+@author_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_export_authors(
+    session: Annotated[async_sessionmaker, Depends(get_read_session)],
+):
+    return StreamingResponse(authors_ndjson(session), media_type="application/x-ndjson")
+
+
+@author_router.get(
+    "/search",
+    response_model=AuthorSearchPageScheme,
+    responses={
+        404: {"description": "Авторы не найдены."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_search_authors(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    offset: Annotated[int, Query(ge=0, le=SEARCH_OFFSET_MAX)] = 0,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+):
+    page = await search_authors(q, db, offset=offset, limit=limit)
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Авторы не найдены."
         )
-        for author in authors
-    ]
 
-    return authors_response
+    authors, next_offset = page
+    return ModelJSONResponse(
+        AuthorSearchPageScheme.model_validate(
+            {"items": [author._mapping for author in authors], "next_offset": next_offset}
+        )
+    )
+
+
+@author_router.get(
+    "/{id}/books",
+    response_model=BookPageScheme,
+    responses={
+        404: {"description": "Книги автора не найдены."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_author_books(
+    id: int,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    after: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    page = await get_all_books(db, after=after, limit=limit, author_id=id)
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Книги автора не найдены."
+        )
+
+    books, next_cursor = page
+    etag = make_page_etag(((book.id, book.version) for book in books), next_cursor)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelJSONResponse(
+        BookPageScheme.model_validate(
+            {"items": [book._mapping for book in books], "next_cursor": next_cursor}
+        ),
+        headers={"ETag": etag},
+    )
 
 
 @author_router.get(
     "/{id}",
-    response_model=AuthorScheme,
+    response_model=Union[AuthorWithBooksScheme, AuthorScheme],
     responses={
         404: {"description": "Автор по указанному айди не найден."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
-async def api_get_author(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+async def api_get_author(
+    id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    include: Optional[Literal["books"]] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    if include == "books":
+        author = await get_author_with_books(id=id, db=db)
+        if not author:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Автор по указанному айди не найден.",
+            )
+
+        etag = make_page_etag(
+            chain([(author.id, author.version)], ((book.id, book.version) for book in author.books)),
+            None,
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        return ModelJSONResponse(
+            AuthorWithBooksScheme.model_validate(author), headers={"ETag": etag}
+        )
+
     author = await get_author(id=id, db=db)
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Автор по указанному айди не найден.",
         )
-    
-    return AuthorScheme(
-            id=author.id,
-            name=author.name,
-            surname=author.surname,
-            date_of_birth=author.date_of_birth,
+
+    etag = make_etag(author.id, author.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelJSONResponse(author, headers={"ETag": etag})
+
+
+def updated_author_response(current_author) -> ModelJSONResponse:
+    if current_author is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Автор по указанному айди не найден.",
         )
+    elif current_author is False:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Автор был изменен другим запросом.",
+        )
+
+    return ModelJSONResponse(
+        AuthorScheme.model_validate(current_author._mapping),
+        headers={"ETag": make_etag(current_author.id, current_author.version)},
+    )
 
 
 @author_router.put(
@@ -97,6 +301,7 @@ async def api_get_author(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
     response_model=AuthorScheme,
     responses={
         404: {"description": "Автор по указанному айди не найден."},
+        412: {"description": "Автор был изменен другим запросом."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
@@ -106,31 +311,61 @@ async def api_update_author(
     surname: str,
     date_of_birth: date,
     db: Annotated[AsyncSession, Depends(get_db)],
+    if_match: Annotated[Optional[str], Header()] = None,
 ):
-    current_author = await update_author(id, name, surname, date_of_birth, db)
+    current_author = await update_author(
+        id, name, surname, date_of_birth, db, versions=parse_if_match(if_match, id)
+    )
+    return updated_author_response(current_author)
 
-    if not current_author:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Автор по указанному айди не найден.",
-        )
-    
-    return AuthorScheme(
-            id=current_author.id,
-            name=current_author.name,
-            surname=current_author.surname,
-            date_of_birth=current_author.date_of_birth,
-        )
+
+@author_router.patch(
+    "/{id}",
+    response_model=AuthorScheme,
+    responses={
+        404: {"description": "Автор по указанному айди не найден."},
+        412: {"description": "Автор был изменен другим запросом."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_patch_author(
+    id: int,
+    author: AuthorUpdateScheme,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    if_match: Annotated[Optional[str], Header()] = None,
+):
+    current_author = await patch_author(
+        id,
+        author.model_dump(exclude_unset=True),
+        db,
+        versions=parse_if_match(if_match, id),
+    )
+    return updated_author_response(current_author)
 
 
 @author_router.delete(
     "/{id}",
     responses={
+        202: {"description": "Фоновое удаление запущено."},
         404: {"description": "Автор по указанному айди не найден."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
-async def api_delete_author(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+async def api_delete_author(
+    id: int, db: Annotated[AsyncSession, Depends(get_db)], purge: bool = False
+):
+    if purge:
+        if not await get_author(id=id, db=db):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Автор по указанному айди не найден.",
+            )
+        job = start_purge("author", id, async_session)
+        return JSONResponse(
+            {"detail": "Удаление автора запущено.", "job": job.as_dict()},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
     deleted_author = await delete_author(id=id, db=db)
     if not deleted_author:
         raise HTTPException(
@@ -1,9 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from ..database import get_db
-from ..crud.book import get_all_books, get_book, create_book, delete_book, update_book
-from typing import Annotated
-from sqlalchemy.ext.asyncio import AsyncSession
-from ..schemes import BookScheme
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from ..database import async_session, get_db, get_read_db, get_read_session
+from ..crud.book import (
+    get_all_books,
+    get_all_books_versions,
+    get_book,
+    create_book,
+    create_books,
+    delete_book,
+    update_book,
+    patch_book,
+    stream_books,
+    search_books,
+    get_book_with_borrows,
+)
+from ..crud.borrow import get_all_borrows
+from typing import Annotated, AsyncGenerator, Literal, Optional, Union
+from itertools import chain
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from ..config import BATCH_SIZE_MAX, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, SEARCH_OFFSET_MAX
+from ..crud.purge import start_purge
+from ..etag import etag_matches, make_etag, make_page_etag, not_modified, parse_if_match
+from ..responses import ModelJSONResponse
+from ..schemes import (
+    BookScheme,
+    BookBatchItemScheme,
+    BookBatchScheme,
+    BookCreateScheme,
+    BookPageScheme,
+    BookSearchPageScheme,
+    BookUpdateScheme,
+    BookWithBorrowsScheme,
+    BookWithBorrowsPageScheme,
+    BorrowFilterScheme,
+    BorrowPageScheme,
+)
 
 book_router = APIRouter()
 
@@ -36,74 +67,262 @@ async def api_create_book(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Автор с указанным айди не найден.",
         )
-    return BookScheme(
-            id=new_book.id,
-            title=new_book.title,
-            description=new_book.description,
-            author_id=new_book.author_id,
-            available_copies=new_book.available_copies,
+    return ModelJSONResponse(BookScheme.model_validate(new_book))
+
+
+@book_router.post(
+    "/batch",
+    response_model=BookBatchScheme,
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_create_books(
+    books: Annotated[
+        list[BookCreateScheme], Body(min_length=1, max_length=BATCH_SIZE_MAX)
+    ],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    new_books = await create_books(books=books, db=db)
+
+    return ModelJSONResponse(
+        BookBatchScheme(
+            items=[
+                BookBatchItemScheme(
+                    index=index, item=BookScheme.model_validate(book._mapping), detail=None
+                )
+                if book
+                else BookBatchItemScheme(
+                    index=index, item=None, detail="Автор с указанным айди не найден."
+                )
+                for index, book in enumerate(new_books)
+            ]
         )
+    )
 
 
 @book_router.get(
     "/",
-    response_model=list[BookScheme],
+    response_model=Union[BookWithBorrowsPageScheme, BookPageScheme],
     responses={
         404: {"description": "Книги не найдены."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
-async def api_get_all_books(db: Annotated[AsyncSession, Depends(get_db)]):
-    books = await get_all_books(db)
-    if not books:
+async def api_get_all_books(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    after: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+    include: Optional[Literal["borrows"]] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    if if_none_match and not include:
+        versions = await get_all_books_versions(db, after=after, limit=limit)
+        if versions:
+            etag = make_page_etag(*versions)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    page = await get_all_books(
+        db, after=after, limit=limit, include_borrows=include == "borrows"
+    )
+    if not page:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Книги не найдены."
-        
         )
-    
-    books_response = [
-        BookScheme(
-            id=book.id,
-            title=book.title,
-            description=book.description,
-            author_id=book.author_id,
-            available_copies=book.available_copies,
+
+    books, next_cursor = page
+    if include == "borrows":
+        etag = make_page_etag(
+            chain.from_iterable(
+                chain([(book.id, book.version)], ((borrow.id, borrow.version) for borrow in book.borrows))
+                for book in books
+            ),
+            next_cursor,
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        return ModelJSONResponse(
+            BookWithBorrowsPageScheme.model_validate(
+                {"items": books, "next_cursor": next_cursor}
+            ),
+            headers={"ETag": etag},
+        )
+
+    etag = make_page_etag(((book.id, book.version) for book in books), next_cursor)
+    return ModelJSONResponse(
+        BookPageScheme.model_validate(
+            {"items": [book._mapping for book in books], "next_cursor": next_cursor}
+        ),
+        headers={"ETag": etag},
+    )
+
+
+async def books_ndjson(session: async_sessionmaker) -> AsyncGenerator[str, None]:
+    async with session() as db:
+        async for books in stream_books(db):
+            yield "".join(
+                BookScheme.model_validate(book._mapping).model_dump_json() + "\n"
+                for book in books
+            )
+
+
+@book_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_export_books(
+    session: Annotated[async_sessionmaker, Depends(get_read_session)],
+):
+    return StreamingResponse(books_ndjson(session), media_type="application/x-ndjson")
+
+
+@book_router.get(
+    "/search",
+    response_model=BookSearchPageScheme,
+    responses={
+        404: {"description": "Книги не найдены."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_search_books(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    offset: Annotated[int, Query(ge=0, le=SEARCH_OFFSET_MAX)] = 0,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+):
+    page = await search_books(q, db, offset=offset, limit=limit)
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Книги не найдены."
         )
-        for book in books
-    ]
 
-    return books_response
+    books, next_offset = page
+    return ModelJSONResponse(
+        BookSearchPageScheme.model_validate(
+            {"items": [book._mapping for book in books], "next_offset": next_offset}
+        )
+    )
+
+
+@book_router.get(
+    "/{id}/borrows",
+    response_model=BorrowPageScheme,
+    responses={
+        404: {"description": "Выдачи книги не найдены."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_book_borrows(
+    id: int,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    after: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    page = await get_all_borrows(
+        db, after=after, limit=limit, filters=BorrowFilterScheme(book_id=id)
+    )
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Выдачи книги не найдены."
+        )
+
+    borrows, next_cursor = page
+    etag = make_page_etag(((borrow.id, borrow.version) for borrow in borrows), next_cursor)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelJSONResponse(
+        BorrowPageScheme.model_validate(
+            {"items": [borrow._mapping for borrow in borrows], "next_cursor": next_cursor}
+        ),
+        headers={"ETag": etag},
+    )
 
 
 @book_router.get(
     "/{id}",
-    response_model=BookScheme,
+    response_model=Union[BookWithBorrowsScheme, BookScheme],
     responses={
         404: {"description": "Книга по указанному айди не найдена."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
-async def api_get_book(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+async def api_get_book(
+    id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    include: Optional[Literal["borrows"]] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    if include == "borrows":
+        book = await get_book_with_borrows(id, db)
+        if not book:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Книга по указанному айди не найдена.",
+            )
+
+        etag = make_page_etag(
+            chain([(book.id, book.version)], ((borrow.id, borrow.version) for borrow in book.borrows)),
+            None,
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        return ModelJSONResponse(
+            BookWithBorrowsScheme.model_validate(book), headers={"ETag": etag}
+        )
+
     book = await get_book(id, db)
     if not book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Книга по указанному айди не найдена.",
         )
-    return BookScheme(
-            id=book.id,
-            title=book.title,
-            description=book.description,
-            author_id=book.author_id,
-            available_copies=book.available_copies,
+
+    etag = make_etag(book.id, book.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelJSONResponse(book, headers={"ETag": etag})
+
+
+def updated_book_response(current_book) -> ModelJSONResponse:
+    if current_book is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Книга по указанному айди не найдена.",
+        )
+    elif current_book is False:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Книга была изменена другим запросом.",
+        )
+    elif current_book == "Author not found":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Автор с указанным айди не найден.",
         )
 
+    return ModelJSONResponse(
+        BookScheme.model_validate(current_book._mapping),
+        headers={"ETag": make_etag(current_book.id, current_book.version)},
+    )
+
 
 @book_router.put(
     "/{id}",
     response_model=BookScheme,
     responses={
+        400: {"description": "Автор с указанным айди не найден."},
         404: {"description": "Книга по указанному айди не найдена."},
+        412: {"description": "Книга была изменена другим запросом."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
@@ -114,6 +333,7 @@ async def api_update_book(
     author_id: int,
     available_copies: int,
     db: Annotated[AsyncSession, Depends(get_db)],
+    if_match: Annotated[Optional[str], Header()] = None,
 ):
     current_book = await update_book(
         id=id,
@@ -122,31 +342,59 @@ async def api_update_book(
         author_id=author_id,
         available_copies=available_copies,
         db=db,
+        versions=parse_if_match(if_match, id),
     )
+    return updated_book_response(current_book)
 
-    if not current_book:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Книга по указанному айди не найдена.",
-        )
 
-    return BookScheme(
-            id=current_book.id,
-            title=current_book.title,
-            description=current_book.description,
-            author_id=current_book.author_id,
-            available_copies=current_book.available_copies,
-        )
+@book_router.patch(
+    "/{id}",
+    response_model=BookScheme,
+    responses={
+        400: {"description": "Автор с указанным айди не найден."},
+        404: {"description": "Книга по указанному айди не найдена."},
+        412: {"description": "Книга была изменена другим запросом."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_patch_book(
+    id: int,
+    book: BookUpdateScheme,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    if_match: Annotated[Optional[str], Header()] = None,
+):
+    current_book = await patch_book(
+        id,
+        book.model_dump(exclude_unset=True),
+        db,
+        versions=parse_if_match(if_match, id),
+    )
+    return updated_book_response(current_book)
 
 
 @book_router.delete(
     "/{id}",
     responses={
+        202: {"description": "Фоновое удаление запущено."},
         404: {"description": "Книга по указанному айди не найдена."},
         500: {"description": "Внутренняя ошибка сервера."},
     },
 )
-async def api_delete_book(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+async def api_delete_book(
+    id: int, db: Annotated[AsyncSession, Depends(get_db)], purge: bool = False
+):
+    if purge:
+        if not await get_book(id=id, db=db):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Книга по указанному айди не найдена.",
+            )
+        job = start_purge("book", id, async_session)
+        return JSONResponse(
+            {"detail": "Удаление книги запущено.", "job": job.as_dict()},
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+
     deleted_book = await delete_book(id=id, db=db)
     if not deleted_book:
         raise HTTPException(
@@ -1,13 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from ..database import get_db
-from ..crud.borrow import get_all_borrows, get_borrow, finished_borrow, create_borrow
-from typing import Annotated, Optional
-from sqlalchemy.ext.asyncio import AsyncSession
-from ..schemes import BorrowScheme, BorrowUpdateScheme
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from ..database import get_db, get_read_db, get_read_session
+from ..crud.borrow import (
+    get_all_borrows,
+    get_all_borrows_versions,
+    get_borrow,
+    finished_borrow,
+    create_borrow,
+    create_borrows,
+    finished_borrows,
+    stream_borrows,
+)
+from typing import Annotated, AsyncGenerator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from ..config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from ..etag import etag_matches, make_etag, make_page_etag, not_modified
+from ..responses import ModelJSONResponse
+from ..schemes import (
+    BorrowBatchCreateScheme,
+    BorrowBatchItemScheme,
+    BorrowBatchReturnScheme,
+    BorrowBatchScheme,
+    BorrowReturnBatchItemScheme,
+    BorrowReturnBatchScheme,
+    BorrowFilterScheme,
+    BorrowScheme,
+    BorrowPageScheme,
+    BorrowUpdateScheme,
+)
 from datetime import date
 
 borrow_router = APIRouter()
 
+BORROW_BATCH_ERRORS = {
+    None: "Книга с указанным айди не найдена.",
+    False: "Нет доступных экземпляров книги с указанным айди.",
+    "Rolled back": "Выдача отменена: другие книги из запроса выдать нельзя.",
+}
+
+RETURN_BATCH_ERRORS = {
+    None: "Запись о выдаче по указанному айди не найдена.",
+    False: "Книга уже сдана.",
+    "Invalid return_date": "Дата возврата не может быть раньше даты взятия книги.",
+    "Rolled back": "Возврат отменен: другие выдачи из запроса завершить нельзя.",
+}
+
 
 @borrow_router.post(
     "/",
@@ -50,44 +87,172 @@ async def api_create_borrow(
             detail="Дата возврата не может быть раньше даты взятия книги.",
         )
 
-    return BorrowScheme(
-            id=borrow.id,
-            book_id=borrow.book_id,
-            reader_name=borrow.reader_name,
-            borrow_date=borrow.borrow_date,
-            return_date=borrow.return_date,
-            is_return=borrow.is_return,
+    return ModelJSONResponse(BorrowScheme.model_validate(borrow._mapping))
+
+
+@borrow_router.post(
+    "/batch",
+    response_model=BorrowBatchScheme,
+    responses={
+        400: {"description": "Часть книг выдать нельзя, выдача отменена целиком."},
+        422: {"description": "Дата возврата не может быть раньше даты взятия книги."},
+        500: {"description": "Внутренняя ошибка сервера"},
+    },
+)
+async def api_create_borrows(
+    borrows: BorrowBatchCreateScheme,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    new_borrows = await create_borrows(
+        book_ids=borrows.book_ids,
+        reader_name=borrows.reader_name,
+        borrow_date=borrows.borrow_date,
+        return_date=borrows.return_date,
+        atomic=borrows.atomic,
+        db=db,
+    )
+
+    if new_borrows == "Invalid return_date":
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Дата возврата не может быть раньше даты взятия книги.",
+        )
+
+    items = [
+        BorrowBatchItemScheme(
+            index=index,
+            item=BorrowScheme.model_validate(borrow._mapping),
+            detail=None,
+        )
+        if borrow not in BORROW_BATCH_ERRORS
+        else BorrowBatchItemScheme(
+            index=index, item=None, detail=BORROW_BATCH_ERRORS[borrow]
+        )
+        for index, borrow in enumerate(new_borrows)
+    ]
+    if borrows.atomic and any(item.item is None for item in items):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[item.model_dump(mode="json") for item in items],
         )
 
+    return ModelJSONResponse(BorrowBatchScheme(items=items))
+
+
+@borrow_router.patch(
+    "/return",
+    response_model=BorrowReturnBatchScheme,
+    responses={
+        400: {"description": "Часть выдач завершить нельзя, возврат отменен целиком."},
+        500: {"description": "Внутренняя ошибка сервера"},
+    },
+)
+async def api_finished_borrows(
+    borrows: BorrowBatchReturnScheme,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    returned_borrows = await finished_borrows(
+        ids=borrows.borrow_ids,
+        return_date=borrows.return_date,
+        atomic=borrows.atomic,
+        db=db,
+    )
+
+    items = [
+        BorrowReturnBatchItemScheme(
+            index=index,
+            item=BorrowUpdateScheme.model_validate(borrow._mapping),
+            detail=None,
+        )
+        if borrow not in RETURN_BATCH_ERRORS
+        else BorrowReturnBatchItemScheme(
+            index=index, item=None, detail=RETURN_BATCH_ERRORS[borrow]
+        )
+        for index, borrow in enumerate(returned_borrows)
+    ]
+    if borrows.atomic and any(item.item is None for item in items):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[item.model_dump(mode="json") for item in items],
+        )
+
+    return ModelJSONResponse(BorrowReturnBatchScheme(items=items))
+
 
 @borrow_router.get(
     "/",
-    response_model=list[BorrowScheme],
+    response_model=BorrowPageScheme,
     responses={
         404: {"description": "Записи о выдаче книг не найдены."},
         500: {"description": "Внутренняя ошибка сервера"},
     },
 )
-async def api_get_all_borrows(db: Annotated[AsyncSession, Depends(get_db)]):
-    borrows = await get_all_borrows(db)
-    if not borrows:
+async def api_get_all_borrows(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    after: Optional[int] = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+    book_id: Optional[int] = None,
+    reader_name: Optional[str] = None,
+    is_return: Optional[bool] = None,
+    borrow_date_from: Optional[date] = None,
+    borrow_date_to: Optional[date] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
+    filters = BorrowFilterScheme(
+        book_id=book_id,
+        reader_name=reader_name,
+        is_return=is_return,
+        borrow_date_from=borrow_date_from,
+        borrow_date_to=borrow_date_to,
+    )
+
+    if if_none_match:
+        versions = await get_all_borrows_versions(
+            db, after=after, limit=limit, filters=filters
+        )
+        if versions:
+            etag = make_page_etag(*versions)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    page = await get_all_borrows(db, after=after, limit=limit, filters=filters)
+    if not page:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Записи о выдаче книг не найдены.",
         )
-    borrows_responses = [
-        BorrowScheme(
-            id=borrow.id,
-            book_id=borrow.book_id,
-            reader_name=borrow.reader_name,
-            borrow_date=borrow.borrow_date,
-            return_date=borrow.return_date,
-            is_return=borrow.is_return,
-        )
-        for borrow in borrows
-    ]
 
-    return borrows_responses
+    borrows, next_cursor = page
+    etag = make_page_etag(((borrow.id, borrow.version) for borrow in borrows), next_cursor)
+    return ModelJSONResponse(
+        BorrowPageScheme.model_validate(
+            {"items": [borrow._mapping for borrow in borrows], "next_cursor": next_cursor}
+        ),
+        headers={"ETag": etag},
+    )
+
+
+async def borrows_ndjson(session: async_sessionmaker) -> AsyncGenerator[str, None]:
+    async with session() as db:
+        async for borrows in stream_borrows(db):
+            yield "".join(
+                BorrowScheme.model_validate(borrow._mapping).model_dump_json() + "\n"
+                for borrow in borrows
+            )
+
+
+@borrow_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_export_borrows(
+    session: Annotated[async_sessionmaker, Depends(get_read_session)],
+):
+    return StreamingResponse(borrows_ndjson(session), media_type="application/x-ndjson")
 
 
 @borrow_router.get(
@@ -98,7 +263,11 @@ async def api_get_all_borrows(db: Annotated[AsyncSession, Depends(get_db)]):
         500: {"description": "Внутренняя ошибка сервера"},
     },
 )
-async def api_get_borrow(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+async def api_get_borrow(
+    id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    if_none_match: Annotated[Optional[str], Header()] = None,
+):
     borrow = await get_borrow(id=id, db=db)
     if not borrow:
         raise HTTPException(
@@ -106,14 +275,11 @@ async def api_get_borrow(id: int, db: Annotated[AsyncSession, Depends(get_db)]):
             detail="Запись о выдаче по указанному айди не найдена.",
         )
 
-    return BorrowScheme(
-            id=borrow.id,
-            book_id=borrow.book_id,
-            reader_name=borrow.reader_name,
-            borrow_date=borrow.borrow_date,
-            return_date=borrow.return_date,
-            is_return=borrow.is_return,
-        )
+    etag = make_etag(borrow.id, borrow.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return ModelJSONResponse(borrow, headers={"ETag": etag})
 
 
 @borrow_router.patch(
@@ -145,7 +311,4 @@ async def api_finished_borrow(
             detail="Дата возврата не может быть раньше даты взятия книги.",
         )
 
-    return BorrowUpdateScheme(
-            id=borrow.id,
-            return_date=borrow.return_date,
-        )
+    return ModelJSONResponse(BorrowUpdateScheme.model_validate(borrow._mapping))
@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from ..cache import cache_invalidation, entity_cache
+from ..database import engine, get_pool_status, replica_engines, statement_cache_stats
+
+debug_router = APIRouter()
+
+
+@debug_router.get(
+    "/pool",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_pool_status():
+    return {
+        **get_pool_status(engine.pool),
+        "replicas": [get_pool_status(replica.pool) for replica in replica_engines],
+    }
+
+
+@debug_router.get(
+    "/cache",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_cache_stats():
+    return {
+        **entity_cache.backend.stats(),
+        "invalidation": cache_invalidation.stats() if cache_invalidation else None,
+    }
+
+
+@debug_router.get(
+    "/statements",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_statement_cache_stats():
+    return {
+        **statement_cache_stats.as_dict(),
+        "compiled_cache_size": len(engine.sync_engine._compiled_cache),
+    }
@@ -0,0 +1,53 @@
+import asyncio
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from ..database import engine, get_pool_status, replica_engines
+from ..health import health_state, ping, primary_probe, replica_probes
+
+health_router = APIRouter()
+
+
+@health_router.get(
+    "/live",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_live():
+    return {"status": "ok"}
+
+
+@health_router.get(
+    "/ready",
+    responses={
+        503: {"description": "Приложение не готово принимать запросы."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_ready():
+    # Only the primary decides readiness: a failed replica is reported, but
+    # does not take a worker that can still serve writes out of rotation.
+    primary, *replicas = await asyncio.gather(
+        ping(primary_probe), *(ping(probe) for probe in replica_probes)
+    )
+    if not health_state.started:
+        state = "starting"
+    elif health_state.draining:
+        state = "draining"
+    elif primary:
+        state = "ready"
+    else:
+        state = "unavailable"
+
+    return JSONResponse(
+        {
+            "status": state,
+            "warmup_seconds": health_state.warmup_seconds,
+            "pool": get_pool_status(engine.pool),
+            "replicas": [
+                {"available": available, "pool": get_pool_status(replica.pool)}
+                for replica, available in zip(replica_engines, replicas)
+            ],
+        },
+        status_code=status.HTTP_200_OK if state == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
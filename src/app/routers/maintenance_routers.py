@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
+from ..database import async_session, get_db
+from ..config import BATCH_SIZE_MAX, RECONCILE_BATCH_SIZE
+from ..crud.purge import purge_jobs
+from ..crud.maintenance import (
+    reconcile_jobs,
+    reset_id_sequence,
+    start_reconcile,
+)
+from typing import Annotated, Literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+maintenance_router = APIRouter()
+
+
+@maintenance_router.post(
+    "/sequences/{table}/reset",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_reset_id_sequence(
+    table: Literal["author", "book", "borrow"],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    next_id = await reset_id_sequence(table=table, db=db)
+    return {"detail": "Счетчик айди успешно сброшен.", "next_id": next_id}
+
+
+@maintenance_router.post(
+    "/counters/reconcile",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_reconcile_counters(
+    batch_size: Annotated[int, Query(ge=1, le=BATCH_SIZE_MAX)] = RECONCILE_BATCH_SIZE,
+):
+    job = start_reconcile(batch_size, async_session)
+    return JSONResponse(
+        {"detail": "Проверка счетчиков запущена.", "job": job.as_dict()},
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/api_library/maintenance/counters/reconcile/{job.id}"},
+    )
+
+
+@maintenance_router.get(
+    "/counters/reconcile/{id}",
+    responses={
+        404: {"description": "Проверка счетчиков не найдена."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_reconcile(id: str):
+    job = reconcile_jobs.get(id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Проверка счетчиков не найдена.",
+        )
+    return job.as_dict()
+
+
+@maintenance_router.get(
+    "/purges",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_purges():
+    return {"items": [job.as_dict() for job in reversed(purge_jobs.values())]}
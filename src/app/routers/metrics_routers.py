@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..metrics import request_metrics
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    responses={
+        200: {"content": {"text/plain; version=0.0.4": {}}},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_metrics():
+    return PlainTextResponse(
+        request_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
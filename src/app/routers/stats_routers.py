@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, Query
+from ..database import get_db, get_read_db
+from ..crud.stats import (
+    get_most_borrowed_books,
+    get_authors_active_borrows,
+    get_borrow_stats,
+    refresh_stats,
+)
+from typing import Annotated
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import LOAN_PERIOD_DAYS, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from ..responses import ModelJSONResponse
+from ..schemes import (
+    AuthorBorrowStatsPageScheme,
+    BookBorrowStatsPageScheme,
+    BorrowStatsScheme,
+)
+from datetime import date
+
+stats_router = APIRouter()
+
+
+@stats_router.get(
+    "/books/most-borrowed",
+    response_model=BookBorrowStatsPageScheme,
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_most_borrowed_books(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+):
+    books = await get_most_borrowed_books(db, limit=limit)
+
+    return ModelJSONResponse(
+        BookBorrowStatsPageScheme.model_validate(
+            {
+                "items": [book._mapping for book in books],
+                "refreshed_at": books[0].refreshed_at if books else None,
+            }
+        )
+    )
+
+
+@stats_router.get(
+    "/authors/active-borrows",
+    response_model=AuthorBorrowStatsPageScheme,
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_authors_active_borrows(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    limit: Annotated[int, Query(ge=1, le=PAGE_SIZE_MAX)] = PAGE_SIZE_DEFAULT,
+):
+    authors = await get_authors_active_borrows(db, limit=limit)
+
+    return ModelJSONResponse(
+        AuthorBorrowStatsPageScheme.model_validate(
+            {
+                "items": [author._mapping for author in authors],
+                "refreshed_at": authors[0].refreshed_at if authors else None,
+            }
+        )
+    )
+
+
+@stats_router.get(
+    "/borrows",
+    response_model=BorrowStatsScheme,
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_get_borrow_stats(db: Annotated[AsyncSession, Depends(get_read_db)]):
+    stats = await get_borrow_stats(db, today=date.today())
+
+    return ModelJSONResponse(
+        BorrowStatsScheme.model_validate(
+            {**stats._mapping, "loan_period_days": LOAN_PERIOD_DAYS}
+        )
+    )
+
+
+@stats_router.post(
+    "/refresh",
+    responses={
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_refresh_stats(db: Annotated[AsyncSession, Depends(get_db)]):
+    refreshed = await refresh_stats(db)
+    if not refreshed:
+        return {"detail": "Статистика уже обновляется.", "refreshed": False}
+    return {"detail": "Статистика успешно обновлена.", "refreshed": True}
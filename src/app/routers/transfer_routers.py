@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from ..database import get_db, get_read_session
+from ..crud.transfer import copy_csv_to_table, copy_table_to_csv
+from typing import Annotated, AsyncGenerator, Literal
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+transfer_router = APIRouter()
+
+IMPORT_ERRORS = {
+    "Invalid csv": "Файл не соответствует формату CSV таблицы.",
+    "Missing value": "В файле есть строки без обязательных значений.",
+    "Duplicate id": "В файле есть повторяющиеся айди.",
+    "Missing parent": "В файле есть ссылки на несуществующие записи.",
+}
+
+
+async def table_csv(table: str, session: async_sessionmaker) -> AsyncGenerator[bytes, None]:
+    async with session() as db:
+        async for chunk in copy_table_to_csv(table, db):
+            yield chunk
+
+
+@transfer_router.get(
+    "/{table}",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/csv": {}}},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_export_table(
+    table: Literal["author", "book", "borrow"],
+    session: Annotated[async_sessionmaker, Depends(get_read_session)],
+):
+    return StreamingResponse(
+        table_csv(table, session),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{table}.csv"'},
+    )
+
+
+@transfer_router.put(
+    "/{table}",
+    openapi_extra={
+        "requestBody": {"content": {"text/csv": {"schema": {"type": "string"}}}},
+    },
+    responses={
+        422: {"description": "Файл не прошел проверку."},
+        500: {"description": "Внутренняя ошибка сервера."},
+    },
+)
+async def api_import_table(
+    table: Literal["author", "book", "borrow"],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    rows = await copy_csv_to_table(table, request.stream(), db)
+    if isinstance(rows, str):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=IMPORT_ERRORS[rows],
+        )
+
+    return {"detail": "Данные успешно загружены.", "rows": rows}
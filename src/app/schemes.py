@@ -1,32 +1,235 @@
-from pydantic import BaseModel
-from datetime import date
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from datetime import date, datetime
+from typing import Annotated, ClassVar, Optional
+from .config import BATCH_SIZE_MAX
 
 
 class AuthorScheme(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     surname: str
     date_of_birth: Optional[date]
+    version: int
+    books_count: int
 
 
 class BookScheme(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     title: str
     description: Optional[str]
     author_id: int
     available_copies: int
+    version: int
+    borrows_count: int
+    active_borrows_count: int
 
 
 class BorrowScheme(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     book_id: int
     reader_name: str
     borrow_date: date
     return_date: Optional[date]
     is_return: bool
+    version: int
+
+
+class AuthorWithBooksScheme(AuthorScheme):
+    books: list[BookScheme]
+
+
+class BookWithBorrowsScheme(BookScheme):
+    borrows: list[BorrowScheme]
+
+
+class AuthorCreateScheme(BaseModel):
+    name: str
+    surname: str
+    date_of_birth: Optional[date] = None
+
+
+class BookCreateScheme(BaseModel):
+    title: str
+    description: Optional[str] = None
+    author_id: int
+    available_copies: int
+
+
+class UpdateScheme(BaseModel):
+    # Only the fields present in the request body are changed.
+    nullable_fields: ClassVar[frozenset[str]] = frozenset()
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        values = self.model_dump(exclude_unset=True)
+        if not values:
+            raise ValueError("Не указаны поля для изменения.")
+
+        empty = [name for name, value in values.items() if value is None and name not in self.nullable_fields]
+        if empty:
+            raise ValueError(f"Поля не могут быть пустыми: {', '.join(empty)}.")
+        return self
+
+
+class AuthorUpdateScheme(UpdateScheme):
+    nullable_fields: ClassVar[frozenset[str]] = frozenset({"date_of_birth"})
+
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    date_of_birth: Optional[date] = None
+
+
+class BookUpdateScheme(UpdateScheme):
+    nullable_fields: ClassVar[frozenset[str]] = frozenset({"description"})
+
+    title: Optional[str] = None
+    description: Optional[str] = None
+    author_id: Optional[int] = None
+    available_copies: Optional[int] = None
+
+
+class BorrowBatchCreateScheme(BaseModel):
+    book_ids: Annotated[list[int], Field(min_length=1, max_length=BATCH_SIZE_MAX)]
+    reader_name: str
+    borrow_date: date
+    return_date: Optional[date] = None
+    atomic: bool = True
+
+
+class BorrowBatchReturnScheme(BaseModel):
+    borrow_ids: Annotated[list[int], Field(min_length=1, max_length=BATCH_SIZE_MAX)]
+    return_date: date
+    atomic: bool = True
+
+
+class BorrowFilterScheme(BaseModel):
+    book_id: Optional[int] = None
+    reader_name: Optional[str] = None
+    is_return: Optional[bool] = None
+    borrow_date_from: Optional[date] = None
+    borrow_date_to: Optional[date] = None
+
+
+class AuthorPageScheme(BaseModel):
+    items: list[AuthorScheme]
+    next_cursor: Optional[int]
+
+
+class BookPageScheme(BaseModel):
+    items: list[BookScheme]
+    next_cursor: Optional[int]
+
+
+class BorrowPageScheme(BaseModel):
+    items: list[BorrowScheme]
+    next_cursor: Optional[int]
+
+
+class AuthorWithBooksPageScheme(BaseModel):
+    items: list[AuthorWithBooksScheme]
+    next_cursor: Optional[int]
+
+
+class BookWithBorrowsPageScheme(BaseModel):
+    items: list[BookWithBorrowsScheme]
+    next_cursor: Optional[int]
+
+
+class AuthorSearchPageScheme(BaseModel):
+    items: list[AuthorScheme]
+    next_offset: Optional[int]
+
+
+class BookSearchPageScheme(BaseModel):
+    items: list[BookScheme]
+    next_offset: Optional[int]
+
+
+class AuthorBatchItemScheme(BaseModel):
+    index: int
+    item: Optional[AuthorScheme]
+    detail: Optional[str]
+
+
+class BookBatchItemScheme(BaseModel):
+    index: int
+    item: Optional[BookScheme]
+    detail: Optional[str]
+
+
+class AuthorBatchScheme(BaseModel):
+    items: list[AuthorBatchItemScheme]
+
+
+class BookBatchScheme(BaseModel):
+    items: list[BookBatchItemScheme]
 
 
 class BorrowUpdateScheme(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     return_date: date
+
+
+class BorrowBatchItemScheme(BaseModel):
+    index: int
+    item: Optional[BorrowScheme]
+    detail: Optional[str]
+
+
+class BorrowReturnBatchItemScheme(BaseModel):
+    index: int
+    item: Optional[BorrowUpdateScheme]
+    detail: Optional[str]
+
+
+class BorrowBatchScheme(BaseModel):
+    items: list[BorrowBatchItemScheme]
+
+
+class BorrowReturnBatchScheme(BaseModel):
+    items: list[BorrowReturnBatchItemScheme]
+
+
+class BookBorrowStatsScheme(BaseModel):
+    rank: int
+    book_id: int
+    title: str
+    borrow_count: int
+    active_count: int
+
+
+class AuthorBorrowStatsScheme(BaseModel):
+    rank: int
+    author_id: int
+    name: str
+    surname: str
+    active_count: int
+    borrow_count: int
+
+
+class BookBorrowStatsPageScheme(BaseModel):
+    items: list[BookBorrowStatsScheme]
+    refreshed_at: Optional[datetime]
+
+
+class AuthorBorrowStatsPageScheme(BaseModel):
+    items: list[AuthorBorrowStatsScheme]
+    refreshed_at: Optional[datetime]
+
+
+class BorrowStatsScheme(BaseModel):
+    borrow_count: int
+    active_count: int
+    returned_count: int
+    overdue_count: int
+    loan_period_days: int
+    average_loan_days: Optional[float]
+    refreshed_at: datetime
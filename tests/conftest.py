@@ -0,0 +1,190 @@
+"""Shared fixtures for the API tests.
+
+The tests talk to a real PostgreSQL database migrated to head and truncate
+author, book and borrow, so point DATABASE_URL at a throwaway one:
+
+    DATABASE_URL=postgresql+asyncpg://... poetry run pytest
+
+Modules that need the database skip themselves when DATABASE_URL is unset.
+"""
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Optional
+
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Response:
+    def __init__(self, status: int, headers: dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+async def request(method: str, url: str, body: Optional[object] = None, headers: Optional[dict] = None) -> Response:
+    """Calls the app in-process; bytes are sent as they are, any other body
+    as JSON."""
+    from app.main import app
+
+    path, _, query = url.partition("?")
+    raw_headers = [(b"host", b"test")]
+    if isinstance(body, bytes):
+        payload = body
+    else:
+        payload = b"" if body is None else json.dumps(body).encode()
+        if body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("test", 0),
+        "server": ("test", 80),
+    }
+    received = False
+    response = {"status": 0, "headers": {}, "body": b""}
+
+    async def receive() -> dict:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                name.decode(): value.decode() for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return Response(response["status"], response["headers"], response["body"])
+
+
+async def seed(authors: int = 20, books_per_author: int = 5, borrows_per_book: int = 3, copies: int = 10) -> dict:
+    """Replace the catalog with generated rows, ids start at 1.
+
+    Every third borrow is returned; the book counters are set from the
+    inserted borrows and the statistics views are refreshed.
+    """
+    from sqlalchemy import text
+
+    from app.crud.stats import refresh_stats
+    from app.database import async_session, engine
+
+    books = authors * books_per_author
+    borrows = books * borrows_per_book
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE author, book, borrow RESTART IDENTITY CASCADE"))
+        await conn.execute(
+            text(
+                "INSERT INTO author (name, surname, date_of_birth) "
+                "SELECT 'name' || g, 'surname' || g, DATE '1970-01-01' + g % 10000 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"count": authors},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO book (title, description, author_id, available_copies) "
+                "SELECT 'title' || g, 'description of book ' || g, (g - 1) % :authors + 1, :copies "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"authors": authors, "copies": copies, "count": books},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO borrow (book_id, reader_name, borrow_date, return_date, is_return) "
+                "SELECT (g - 1) % :books + 1, 'reader' || g % 50, CURRENT_DATE - 30 - g % 300, "
+                "CASE WHEN g % 3 = 0 THEN CURRENT_DATE END, g % 3 = 0 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"books": books, "count": borrows},
+        )
+        await conn.execute(
+            text(
+                "UPDATE book SET borrows_count = counts.borrows_count, "
+                "active_borrows_count = counts.active_borrows_count "
+                "FROM (SELECT book_id, count(*) AS borrows_count, "
+                "count(*) FILTER (WHERE NOT is_return) AS active_borrows_count "
+                "FROM borrow GROUP BY book_id) AS counts "
+                "WHERE book.id = counts.book_id"
+            )
+        )
+        await conn.execute(text("ANALYZE author, book, borrow"))
+    async with async_session() as db:
+        await refresh_stats(db)
+    return {"authors": authors, "books": books, "borrows": borrows}
+
+
+@pytest.fixture(autouse=True)
+def no_entity_cache():
+    from app.cache import NullCacheBackend, entity_cache
+
+    backend = entity_cache.backend
+    entity_cache.backend = NullCacheBackend()
+    yield
+    entity_cache.backend = backend
+
+
+@pytest.fixture(autouse=True)
+async def dispose_engines():
+    # asyncpg connections belong to the event loop that opened them and every
+    # test runs in a loop of its own.
+    yield
+    if os.environ.get("DATABASE_URL"):
+        from app.database import engine, replica_engines
+        from app.health import primary_probe, replica_probes
+
+        for database in (engine, *replica_engines, primary_probe, *replica_probes):
+            await database.dispose()
+
+
+@pytest.fixture
+def client() -> Callable[..., Awaitable[Response]]:
+    return request
+
+
+@pytest.fixture
+def seed_catalog() -> Callable[..., Awaitable[dict]]:
+    return seed
+
+
+@pytest.fixture
+def max_queries():
+    """`with max_queries(n):` fails the test when the block runs more than n
+    SQL statements and lists the ones that ran."""
+    from app.database import assert_max_queries
+
+    return assert_max_queries
+
+
+@pytest.fixture
+async def has_trigram_extension() -> bool:
+    """Whether pg_trgm, needed by the author search, is installed."""
+    from sqlalchemy import text
+
+    from app.database import engine
+
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+        return result.scalar() is not None
@@ -0,0 +1,88 @@
+"""POST /borrows/batch with a book listed more times than it has copies, and
+PATCH /borrows/return with a borrow listed twice."""
+import os
+from datetime import date
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+TODAY = date.today().isoformat()
+
+
+async def borrow_batch(client, book_ids: list[int], atomic: bool):
+    return await client(
+        "POST",
+        "/api_library/borrows/batch",
+        {"book_ids": book_ids, "reader_name": "reader", "borrow_date": TODAY, "atomic": atomic},
+    )
+
+
+async def available_copies(client, id: int) -> int:
+    return (await client("GET", f"/api_library/books/{id}")).json()["available_copies"]
+
+
+async def test_repeated_book_gives_its_copies_to_first_occurrences(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=2, borrows_per_book=0, copies=1)
+
+    response = await borrow_batch(client, [1, 2, 1, 1], atomic=False)
+
+    assert response.status == 200
+    items = response.json()["items"]
+    assert [item["item"]["book_id"] if item["item"] else None for item in items] == [1, 2, None, None]
+    assert items[0]["item"]["id"] < items[1]["item"]["id"]
+    assert all(item["detail"] for item in items[2:])
+    assert await available_copies(client, 1) == 0
+    assert await available_copies(client, 2) == 0
+
+
+async def test_repeated_book_within_its_copies_is_borrowed_each_time(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=2, borrows_per_book=0, copies=2)
+
+    response = await borrow_batch(client, [1, 2, 1], atomic=True)
+
+    assert response.status == 200
+    assert [item["item"]["book_id"] for item in response.json()["items"]] == [1, 2, 1]
+    assert await available_copies(client, 1) == 0
+    assert await available_copies(client, 2) == 1
+
+
+async def test_atomic_batch_over_copies_changes_nothing(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=1, borrows_per_book=0, copies=1)
+
+    response = await borrow_batch(client, [1, 1], atomic=True)
+
+    assert response.status == 400
+    assert await available_copies(client, 1) == 1
+    assert (await client("GET", "/api_library/borrows/")).status == 404
+
+
+async def return_batch(client, borrow_ids: list[int], atomic: bool):
+    return await client(
+        "PATCH",
+        "/api_library/borrows/return",
+        {"borrow_ids": borrow_ids, "return_date": TODAY, "atomic": atomic},
+    )
+
+
+async def test_repeated_borrow_is_returned_once(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=1, borrows_per_book=2, copies=1)
+
+    response = await return_batch(client, [1, 2, 1], atomic=False)
+
+    assert response.status == 200
+    items = response.json()["items"]
+    assert [item["item"]["id"] if item["item"] else None for item in items] == [1, 2, None]
+    assert items[2]["detail"] == "Книга уже сдана."
+    assert await available_copies(client, 1) == 3
+
+
+async def test_atomic_return_with_repeated_borrow_changes_nothing(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=1, borrows_per_book=2, copies=1)
+
+    response = await return_batch(client, [1, 1], atomic=True)
+
+    assert response.status == 400
+    assert await available_copies(client, 1) == 1
+    assert (await client("GET", "/api_library/borrows/1")).json()["is_return"] is False
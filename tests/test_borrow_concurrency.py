@@ -0,0 +1,38 @@
+"""Concurrent create_borrow calls on one book never oversell its copies."""
+import asyncio
+import os
+from datetime import date
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+from app.crud.borrow import create_borrow  # noqa: E402
+from app.database import async_session  # noqa: E402
+from app.models import Book, Borrow  # noqa: E402
+
+
+async def borrow_once(book_id: int, reader: int):
+    async with async_session() as db:
+        return await create_borrow(book_id, f"reader{reader}", date.today(), db)
+
+
+@pytest.mark.parametrize("attempts, copies", [(300, 100), (50, 100)])
+async def test_concurrent_borrows_of_one_book(attempts, copies, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=1, borrows_per_book=0, copies=copies)
+
+    results = await asyncio.gather(*(borrow_once(1, reader) for reader in range(attempts)))
+
+    async with async_session() as db:
+        available = (await db.execute(select(Book.available_copies).filter(Book.id == 1))).scalar()
+        borrows = (await db.execute(select(func.count()).select_from(Borrow))).scalar()
+
+    succeeded = sum(result not in (None, False) for result in results)
+    assert available >= 0
+    assert borrows == succeeded == min(attempts, copies)
+    assert available == copies - borrows
+    assert results.count(False) == attempts - succeeded
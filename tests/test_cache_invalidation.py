@@ -0,0 +1,118 @@
+"""Writes reach the entity caches of every worker through NOTIFY, sent by the
+notify_entity_cache triggers on commit."""
+import asyncio
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import update  # noqa: E402
+
+from app.cache import (  # noqa: E402
+    CacheBackend,
+    CacheInvalidationListener,
+    EntityCache,
+    MemoryCacheBackend,
+)
+from app.config import CACHE_INVALIDATION_CHANNEL  # noqa: E402
+from app.crud.book import patch_book  # noqa: E402
+from app.database import async_session  # noqa: E402
+from app.models import Book  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    not CACHE_INVALIDATION_CHANNEL, reason="CACHE_INVALIDATION_CHANNEL is empty"
+)
+
+
+async def eventually(condition, timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def start_workers():
+    """Starts two listeners with caches of their own; the tests seed first,
+    so the counter updates of the seed are not received."""
+    tasks = []
+
+    async def start() -> list[CacheInvalidationListener]:
+        listeners = []
+        for _ in range(2):
+            cache = EntityCache(MemoryCacheBackend(max_size=100, ttl=60))
+            listener = CacheInvalidationListener(cache, os.environ["DATABASE_URL"], CACHE_INVALIDATION_CHANNEL)
+            listeners.append(listener)
+            tasks.append(asyncio.create_task(listener.run()))
+        await eventually(lambda: all(listener.connection is not None for listener in listeners))
+        return listeners
+
+    yield start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def cache_books(listener: CacheInvalidationListener, *ids: int) -> None:
+    cache = listener.cache
+    for id in ids:
+        await cache.set("book", id, {"id": id}, cache.generation("book"))
+
+
+async def test_committed_write_drops_every_workers_entry(start_workers, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=2, borrows_per_book=0)
+    workers = await start_workers()
+    for listener in workers:
+        await cache_books(listener, 1, 2)
+    generation = workers[1].cache.generation("book")
+
+    async with async_session() as db:
+        await patch_book(1, {"title": "patched"}, db)
+
+    await eventually(lambda: all(listener.received == 1 for listener in workers))
+    for listener in workers:
+        assert await listener.cache.get("book", 1) is None
+        assert await listener.cache.get("book", 2) is not None
+    # A read that started before the invalidation must not store its row.
+    assert workers[1].cache.generation("book") != generation
+
+
+async def test_statement_sends_one_notification_and_rollback_none(start_workers, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=4, borrows_per_book=0)
+    workers = await start_workers()
+    listener = workers[0]
+    await cache_books(listener, 1, 2, 3, 4)
+
+    async with async_session() as db:
+        await db.execute(update(Book).where(Book.id == 4).values(title="discarded"))
+        await db.rollback()
+        await db.execute(update(Book).where(Book.id.in_([1, 2, 3])).values(title="batch"))
+        await db.commit()
+
+    await eventually(lambda: listener.received == 1)
+    await asyncio.sleep(0.1)
+    assert listener.received == 1
+    for id in (1, 2, 3):
+        assert await listener.cache.get("book", id) is None
+    assert await listener.cache.get("book", 4) is not None
+
+
+async def test_large_statement_drops_the_namespace(start_workers, seed_catalog):
+    await seed_catalog(authors=20, books_per_author=100, borrows_per_book=0)
+    workers = await start_workers()
+    listener = workers[0]
+    await cache_books(listener, 1, 2000)
+
+    async with async_session() as db:
+        await db.execute(update(Book).values(version=Book.version + 1))
+        await db.commit()
+
+    await eventually(lambda: listener.received == 1)
+    assert await listener.cache.get("book", 1) is None
+    assert await listener.cache.get("book", 2000) is None
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
@@ -0,0 +1,87 @@
+"""Counters stay equal to the rows they count after every kind of change, and
+a borrow or a return updates the book row once."""
+import csv
+import io
+import os
+from datetime import date
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import text  # noqa: E402
+
+from app.database import engine  # noqa: E402
+
+TODAY = date.today().isoformat()
+
+DRIFT = """
+SELECT
+    (SELECT count(*) FROM author
+     WHERE books_count <> (SELECT count(*) FROM book WHERE book.author_id = author.id)),
+    (SELECT count(*) FROM book
+     WHERE borrows_count <> (SELECT count(*) FROM borrow WHERE borrow.book_id = book.id)
+        OR active_borrows_count <> (
+            SELECT count(*) FROM borrow WHERE borrow.book_id = book.id AND NOT is_return
+        ))
+"""
+
+
+async def drift() -> tuple[int, int]:
+    async with engine.connect() as conn:
+        return tuple((await conn.execute(text(DRIFT))).one())
+
+
+async def book_version(client, id: int) -> int:
+    return (await client("GET", f"/api_library/books/{id}")).json()["version"]
+
+
+async def test_counters_follow_borrows_and_returns(client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=3, borrows_per_book=2)
+    version = await book_version(client, 1)
+
+    response = await client("POST", f"/api_library/borrows/?book_id=1&reader_name=reader&borrow_date={TODAY}")
+    assert response.status == 200
+    borrow_id = response.json()["id"]
+    assert await book_version(client, 1) == version + 1
+
+    response = await client(
+        "POST",
+        "/api_library/borrows/batch",
+        {"book_ids": [2, 3, 2], "reader_name": "reader", "borrow_date": TODAY},
+    )
+    assert response.status < 300
+    response = await client("PATCH", f"/api_library/borrows/{borrow_id}/response?return_date={TODAY}")
+    assert response.status == 200
+    assert await book_version(client, 1) == version + 2
+    response = await client("PATCH", "/api_library/borrows/return", {"borrow_ids": [1, 2, 4], "return_date": TODAY})
+    assert response.status < 300
+
+    assert await drift() == (0, 0)
+
+
+async def test_counters_follow_author_moves_deletes_and_loads(client, seed_catalog):
+    await seed_catalog(authors=3, books_per_author=3, borrows_per_book=2)
+
+    assert (await client("PATCH", "/api_library/books/1", {"author_id": 2})).status == 200
+    assert (await client("DELETE", "/api_library/books/2")).status < 300
+    assert (await client("DELETE", "/api_library/authors/3")).status < 300
+
+    exported = (await client("GET", "/api_library/transfer/borrow")).body.decode()
+    rows = list(csv.DictReader(io.StringIO(exported)))
+    # Move a borrow to another book, return one and add a new one.
+    rows[0]["book_id"] = "4"
+    rows[1].update(return_date=TODAY, is_return="t")
+    rows.append({**rows[2], "id": "1000", "book_id": "5", "return_date": "", "is_return": "f"})
+    loaded = io.StringIO()
+    writer = csv.DictWriter(loaded, fieldnames=rows[0].keys())
+    writer.writeheader()
+    writer.writerows(rows)
+
+    response = await client(
+        "PUT", "/api_library/transfer/borrow", loaded.getvalue().encode(), {"content-type": "text/csv"}
+    )
+    assert response.status == 200, response.body
+
+    assert await drift() == (0, 0)
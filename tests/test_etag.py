@@ -0,0 +1,157 @@
+"""ETag preconditions: If-None-Match on reads, If-Match on PUT/PATCH of
+authors and books."""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from app.cache import MemoryCacheBackend, entity_cache  # noqa: E402
+
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(entity_cache, "backend", MemoryCacheBackend(max_size=100, ttl=60))
+
+
+@pytest.mark.parametrize("resource", ["authors", "books"])
+async def test_matching_if_match_updates_and_returns_the_new_etag(resource, client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+    url = f"/api_library/{resource}/1"
+    etag = (await client("GET", url)).headers["etag"]
+    field = "surname" if resource == "authors" else "title"
+
+    response = await client("PATCH", url, {field: "patched"}, {"If-Match": etag})
+
+    assert response.status == 200
+    assert response.json()[field] == "patched"
+    assert response.headers["etag"] != etag
+    assert (await client("GET", url)).headers["etag"] == response.headers["etag"]
+
+
+@pytest.mark.parametrize("resource", ["authors", "books"])
+async def test_stale_if_match_is_rejected(resource, client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+    url = f"/api_library/{resource}/1"
+    field = "surname" if resource == "authors" else "title"
+    stale = (await client("GET", url)).headers["etag"]
+    assert (await client("PATCH", url, {field: "first"}, {"If-Match": stale})).status == 200
+
+    response = await client("PATCH", url, {field: "second"}, {"If-Match": stale})
+
+    assert response.status == 412
+    assert (await client("GET", url)).json()[field] == "first"
+
+
+async def test_put_with_stale_if_match_is_rejected(client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+
+    response = await client(
+        "PUT",
+        "/api_library/books/1?title=renamed&description=book&author_id=1&available_copies=3",
+        headers={"If-Match": '"1-0"'},
+    )
+
+    assert response.status == 412
+
+
+async def test_weak_if_match_tag_is_ignored(client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+    url = "/api_library/books/1"
+
+    # If-Match uses strong comparison, so a weak tag never matches...
+    response = await client("PATCH", url, {"title": "weak"}, {"If-Match": 'W/"1-1"'})
+    assert response.status == 412
+
+    # ...and is skipped when a strong tag is listed next to it.
+    response = await client("PATCH", url, {"title": "strong"}, {"If-Match": 'W/"1-1", "1-1"'})
+    assert response.status == 200
+
+
+@pytest.mark.parametrize(
+    "resource, body",
+    [
+        ("authors", {}),
+        ("authors", {"name": None}),
+        ("authors", {"surname": None}),
+        ("books", {}),
+        ("books", {"title": None}),
+        ("books", {"author_id": None}),
+        ("books", {"available_copies": None}),
+    ],
+)
+async def test_patch_rejects_empty_body_and_nulls(resource, body, client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+
+    response = await client("PATCH", f"/api_library/{resource}/1", body)
+
+    assert response.status == 422
+
+
+@pytest.mark.parametrize("resource, body", [("authors", {"date_of_birth": None}), ("books", {"description": None})])
+async def test_patch_clears_nullable_fields(resource, body, client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+
+    response = await client("PATCH", f"/api_library/{resource}/1", body)
+
+    assert response.status == 200
+    assert response.json() | body == response.json()
+
+
+async def test_moving_a_book_invalidates_both_authors(memory_cache, client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+    # Book 1 belongs to author 1, book 2 to author 2; both are cached now.
+    assert (await client("GET", "/api_library/authors/1")).json()["books_count"] == 2
+    assert (await client("GET", "/api_library/authors/2")).json()["books_count"] == 2
+
+    response = await client("PATCH", "/api_library/books/1", {"author_id": 2})
+
+    assert response.status == 200
+    assert (await client("GET", "/api_library/authors/1")).json()["books_count"] == 1
+    assert (await client("GET", "/api_library/authors/2")).json()["books_count"] == 3
+
+
+async def test_unchanged_book_is_not_modified(client, seed_catalog, max_queries):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=0)
+    etag = (await client("GET", "/api_library/books/1")).headers["etag"]
+
+    with max_queries(1):
+        response = await client("GET", "/api_library/books/1", headers={"If-None-Match": etag})
+
+    assert response.status == 304
+    assert response.headers["etag"] == etag
+    assert response.body == b""
+
+
+@pytest.mark.parametrize("url", ["/api_library/books/?after=2&limit=5", "/api_library/borrows/?after=2&limit=5"])
+async def test_unchanged_page_is_not_modified_after_one_query(url, client, seed_catalog, max_queries):
+    await seed_catalog(authors=2, books_per_author=5, borrows_per_book=2)
+    first = await client("GET", url)
+    assert len(first.json()["items"]) == 5
+
+    # Only the ids and versions of the page are read to compare the tag.
+    with max_queries(1):
+        response = await client("GET", url, headers={"If-None-Match": first.headers["etag"]})
+
+    assert response.status == 304
+    assert response.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.parametrize(
+    "url, write",
+    [
+        ("/api_library/books/3", ("PATCH", "/api_library/books/3", {"title": "patched"})),
+        ("/api_library/books/?after=2&limit=5", ("PATCH", "/api_library/books/3", {"title": "patched"})),
+        ("/api_library/borrows/?after=2&limit=5", ("PATCH", "/api_library/borrows/4/response?return_date=2100-01-01", None)),
+    ],
+)
+async def test_etag_changes_after_a_write(url, write, client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=5, borrows_per_book=2)
+    etag = (await client("GET", url)).headers["etag"]
+    assert (await client(*write)).status == 200
+
+    response = await client("GET", url, headers={"If-None-Match": etag})
+
+    assert response.status == 200
+    assert response.headers["etag"] != etag
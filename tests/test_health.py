@@ -0,0 +1,72 @@
+"""Readiness flips to 503 on SIGTERM before the server starts stopping, and
+does not depend on a free connection in the request pool."""
+import asyncio
+import os
+import signal
+from contextlib import AsyncExitStack
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from app.config import DB_MAX_OVERFLOW, DB_POOL_SIZE  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.health import health_state, install_drain_signal_handler  # noqa: E402
+
+
+@pytest.fixture
+def server_handler(monkeypatch):
+    # Stands in for the handler uvicorn installs before the lifespan startup.
+    received = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    monkeypatch.setattr(health_state, "started", True)
+    monkeypatch.setattr(health_state, "draining", False)
+    yield received
+    signal.signal(signal.SIGTERM, previous)
+
+
+async def test_ready_until_sigterm(server_handler, client):
+    install_drain_signal_handler(0.2)
+
+    response = await client("GET", "/health/ready")
+
+    assert response.status == 200
+    assert response.json()["status"] == "ready"
+
+
+async def test_sigterm_drains_before_passing_the_signal_on(server_handler, client):
+    install_drain_signal_handler(0.2)
+
+    signal.raise_signal(signal.SIGTERM)
+    response = await client("GET", "/health/ready")
+
+    assert response.status == 503
+    assert response.json()["status"] == "draining"
+    assert (await client("GET", "/health/live")).status == 200
+    assert server_handler == []
+
+    await asyncio.sleep(0.3)
+    assert server_handler == [signal.SIGTERM]
+
+
+async def test_second_sigterm_is_passed_on_at_once(server_handler):
+    install_drain_signal_handler(60)
+
+    signal.raise_signal(signal.SIGTERM)
+    signal.raise_signal(signal.SIGTERM)
+    await asyncio.sleep(0)
+
+    assert server_handler == [signal.SIGTERM]
+
+
+async def test_saturated_pool_stays_ready(server_handler, client):
+    async with AsyncExitStack() as stack:
+        for _ in range(DB_POOL_SIZE + DB_MAX_OVERFLOW):
+            await stack.enter_async_context(engine.connect())
+
+        async with asyncio.timeout(1):
+            response = await client("GET", "/health/ready")
+
+    assert response.status == 200
+    assert response.json()["pool"]["checked_out"] == DB_POOL_SIZE + DB_MAX_OVERFLOW
@@ -0,0 +1,68 @@
+"""`include=` loads children in one extra query and at most
+INCLUDE_CHILDREN_MAX of them per parent; the rest is paged separately."""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from app.config import INCLUDE_CHILDREN_MAX  # noqa: E402
+
+CHILDREN = INCLUDE_CHILDREN_MAX + 5
+
+
+def children_of(item: dict) -> list[dict]:
+    return item["borrows"] if "borrows" in item else item["books"]
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api_library/books/?include=borrows",
+        "/api_library/books/2?include=borrows",
+        "/api_library/authors/?include=books",
+        "/api_library/authors/2?include=books",
+    ],
+)
+async def test_include_costs_two_queries_and_caps_children(url, client, seed_catalog, max_queries):
+    await seed_catalog(authors=3, books_per_author=CHILDREN, borrows_per_book=CHILDREN)
+
+    with max_queries(2):
+        response = await client("GET", url)
+
+    assert response.status == 200
+    body = response.json()
+    for item in body.get("items", [body]):
+        ids = [child["id"] for child in children_of(item)]
+        assert len(ids) == INCLUDE_CHILDREN_MAX
+        assert ids == sorted(ids)
+
+
+async def test_include_returns_first_children_by_id(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=2, borrows_per_book=3)
+
+    response = await client("GET", "/api_library/books/2?include=borrows")
+
+    assert response.status == 200
+    # Borrows are spread round-robin over the two books.
+    assert [borrow["id"] for borrow in response.json()["borrows"]] == [2, 4, 6]
+
+
+async def test_book_borrows_are_paged_by_cursor(client, seed_catalog, max_queries):
+    await seed_catalog(authors=1, books_per_author=2, borrows_per_book=CHILDREN)
+
+    ids, after = [], None
+    while True:
+        url = "/api_library/books/1/borrows?limit=7" + (f"&after={after}" if after else "")
+        with max_queries(1):
+            response = await client("GET", url)
+        assert response.status == 200
+        page = response.json()
+        ids.extend(borrow["id"] for borrow in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert ids == list(range(1, 2 * CHILDREN, 2))
+    assert (await client("GET", "/api_library/books/3/borrows")).status == 404
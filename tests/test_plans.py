@@ -0,0 +1,137 @@
+"""Plan regression checks for the queries issued by app.crud.
+
+The catalog is seeded once per module, large enough for the planner to
+prefer indexes; each CRUD function runs while the SQL it sends is recorded,
+then every statement is EXPLAINed and must not read author, book, borrow or
+the statistics views with a sequential scan. The stream_* exports read whole
+tables on purpose and are left out.
+"""
+import asyncio
+import json
+import os
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import event, text  # noqa: E402
+
+from app.crud import author, book, borrow, maintenance, stats  # noqa: E402
+from app.database import async_session, engine  # noqa: E402
+from app.schemes import BorrowFilterScheme  # noqa: E402
+
+from conftest import seed  # noqa: E402
+
+AUTHORS = 2000
+MIDDLE = AUTHORS // 2
+TABLES = {"author", "book", "borrow", "book_borrow_stats", "author_borrow_stats"}
+
+CALLS = [
+    ("create_author", lambda db: author.create_author("name", "surname", date(2000, 1, 1), db)),
+    ("get_all_authors", lambda db: author.get_all_authors(db, after=MIDDLE)),
+    ("get_all_authors_versions", lambda db: author.get_all_authors_versions(db, after=MIDDLE)),
+    ("get_author", lambda db: author.get_author(MIDDLE, db)),
+    ("get_all_authors_with_books", lambda db: author.get_all_authors(db, after=MIDDLE, include_books=True)),
+    ("get_author_with_books", lambda db: author.get_author_with_books(MIDDLE, db)),
+    ("search_authors", lambda db: author.search_authors("name42", db)),
+    ("update_author", lambda db: author.update_author(MIDDLE, "name", "surname", None, db)),
+    ("patch_author", lambda db: author.patch_author(MIDDLE, {"name": "name"}, db)),
+    ("create_book", lambda db: book.create_book("title", None, MIDDLE, 10, db)),
+    ("get_all_books", lambda db: book.get_all_books(db, after=MIDDLE)),
+    ("get_all_books_versions", lambda db: book.get_all_books_versions(db, after=MIDDLE)),
+    ("get_book", lambda db: book.get_book(MIDDLE, db)),
+    ("get_all_books_by_author", lambda db: book.get_all_books(db, author_id=MIDDLE)),
+    ("get_all_books_with_borrows", lambda db: book.get_all_books(db, after=MIDDLE, include_borrows=True)),
+    ("get_book_with_borrows", lambda db: book.get_book_with_borrows(MIDDLE, db)),
+    ("search_books", lambda db: book.search_books("title42", db)),
+    ("update_book", lambda db: book.update_book(MIDDLE, "title", None, MIDDLE, 10, db)),
+    ("patch_book", lambda db: book.patch_book(MIDDLE, {"available_copies": 9}, db)),
+    ("create_borrow", lambda db: borrow.create_borrow(MIDDLE, "reader", date.today(), db)),
+    ("create_borrows", lambda db: borrow.create_borrows([MIDDLE, MIDDLE + 1, MIDDLE + 1], "reader", date.today(), db)),
+    ("get_all_borrows", lambda db: borrow.get_all_borrows(db, after=MIDDLE)),
+    ("get_all_borrows_versions", lambda db: borrow.get_all_borrows_versions(db, after=MIDDLE)),
+    ("get_all_borrows_by_book", lambda db: borrow.get_all_borrows(db, filters=BorrowFilterScheme(book_id=MIDDLE))),
+    (
+        "get_all_borrows_active_by_reader",
+        lambda db: borrow.get_all_borrows(db, filters=BorrowFilterScheme(reader_name="reader42", is_return=False)),
+    ),
+    ("get_all_borrows_by_reader", lambda db: borrow.get_all_borrows(db, filters=BorrowFilterScheme(reader_name="reader42"))),
+    (
+        "get_all_borrows_by_date",
+        lambda db: borrow.get_all_borrows(
+            db, filters=BorrowFilterScheme(borrow_date_from=date.today().replace(day=1), borrow_date_to=date.today())
+        ),
+    ),
+    ("get_borrow", lambda db: borrow.get_borrow(MIDDLE, db)),
+    ("finished_borrow", lambda db: borrow.finished_borrow(MIDDLE + 1, date.today(), db)),
+    ("finished_borrows", lambda db: borrow.finished_borrows([MIDDLE + 4, MIDDLE + 5], date.today(), db)),
+    ("get_most_borrowed_books", lambda db: stats.get_most_borrowed_books(db, limit=50)),
+    ("get_authors_active_borrows", lambda db: stats.get_authors_active_borrows(db, limit=50)),
+    ("get_borrow_stats", lambda db: stats.get_borrow_stats(db, today=date.today())),
+    ("delete_book", lambda db: book.delete_book(MIDDLE + 1, db)),
+    ("delete_author", lambda db: author.delete_author(MIDDLE + 2, db)),
+    ("reset_id_sequence", lambda db: maintenance.reset_id_sequence("borrow", db)),
+]
+
+
+async def seed_and_analyze() -> None:
+    await seed(authors=AUTHORS, books_per_author=50, borrows_per_book=1)
+    async with engine.begin() as conn:
+        for view in stats.STATS_VIEWS:
+            await conn.execute(text(f"ANALYZE {view.name}"))
+    await engine.dispose()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def plan_catalog():
+    asyncio.run(seed_and_analyze())
+
+
+@contextmanager
+def capture_statements():
+    statements: list[tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+def seq_scans(plan: dict) -> list[str]:
+    scans = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in TABLES:
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans.extend(seq_scans(child))
+    return scans
+
+
+@pytest.mark.parametrize("name, call", CALLS, ids=[name for name, _ in CALLS])
+async def test_crud_call_avoids_seq_scans(name, call, has_trigram_extension):
+    if name == "search_authors" and not has_trigram_extension:
+        pytest.skip("pg_trgm is not installed")
+
+    with capture_statements() as statements:
+        async with async_session() as db:
+            await call(db)
+
+    plans = {}
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+                continue
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            plans[" ".join(statement.split())] = seq_scans(plan[0]["Plan"])
+        await conn.rollback()
+
+    assert statements
+    assert not {statement: scans for statement, scans in plans.items() if scans}
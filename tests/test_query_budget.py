@@ -0,0 +1,79 @@
+"""Query budget of every API route.
+
+Each route is called once on a small seeded catalog with the entity cache
+disabled; a new lazy load or per-row query pushes it over its budget and the
+failure lists the statements that ran. Each route must also return at least
+the given number of items, so a budget is never met by an empty answer.
+"""
+import os
+from datetime import date
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+TODAY = date.today().isoformat()
+
+ROUTES = [
+    ("GET /authors", "GET", "/api_library/authors/?after=5", None, 1, 15),
+    ("GET /authors?include=books", "GET", "/api_library/authors/?after=5&include=books", None, 2, 15),
+    ("GET /authors/search", "GET", "/api_library/authors/search?q=name1", None, 1, 1),
+    ("GET /authors/{id}", "GET", "/api_library/authors/3", None, 1, 1),
+    ("GET /authors/{id}?include=books", "GET", "/api_library/authors/3?include=books", None, 2, 1),
+    ("GET /authors/{id}/books", "GET", "/api_library/authors/3/books", None, 1, 5),
+    ("GET /books", "GET", "/api_library/books/?after=10", None, 1, 50),
+    ("GET /books?include=borrows", "GET", "/api_library/books/?after=10&include=borrows", None, 2, 50),
+    ("GET /books/search", "GET", "/api_library/books/search?q=title1", None, 1, 12),
+    ("GET /books/{id}", "GET", "/api_library/books/7", None, 1, 1),
+    ("GET /books/{id}?include=borrows", "GET", "/api_library/books/7?include=borrows", None, 2, 1),
+    ("GET /books/{id}/borrows", "GET", "/api_library/books/7/borrows", None, 1, 3),
+    ("GET /borrows", "GET", "/api_library/borrows/?after=10", None, 1, 50),
+    ("GET /borrows?book_id", "GET", "/api_library/borrows/?book_id=7", None, 1, 3),
+    ("GET /borrows?reader_name&is_return", "GET", "/api_library/borrows/?reader_name=reader1&is_return=false", None, 1, 4),
+    ("GET /borrows/{id}", "GET", "/api_library/borrows/11", None, 1, 1),
+    ("GET /stats/books/most-borrowed", "GET", "/api_library/stats/books/most-borrowed", None, 1, 50),
+    ("GET /stats/authors/active-borrows", "GET", "/api_library/stats/authors/active-borrows", None, 1, 20),
+    ("GET /stats/borrows", "GET", "/api_library/stats/borrows", None, 1, 1),
+    ("POST /authors", "POST", "/api_library/authors/?name=new&surname=author&date_of_birth=1980-01-01", None, 2, 1),
+    ("POST /authors/batch", "POST", "/api_library/authors/batch", [{"name": "new", "surname": "author"}] * 10, 1, 10),
+    ("PUT /authors/{id}", "PUT", "/api_library/authors/3?name=renamed&surname=author&date_of_birth=1980-01-01", None, 1, 1),
+    ("PATCH /authors/{id}", "PATCH", "/api_library/authors/3", {"surname": "patched"}, 1, 1),
+    ("POST /books", "POST", "/api_library/books/?title=new&description=book&author_id=3&available_copies=5", None, 3, 1),
+    ("POST /books/batch", "POST", "/api_library/books/batch", [{"title": "new", "author_id": 3, "available_copies": 5}] * 10, 2, 10),
+    ("PUT /books/{id}", "PUT", "/api_library/books/7?title=renamed&description=book&author_id=4&available_copies=10", None, 1, 1),
+    ("PATCH /books/{id}", "PATCH", "/api_library/books/7", {"title": "patched"}, 1, 1),
+    ("POST /borrows", "POST", f"/api_library/borrows/?book_id=7&reader_name=reader&borrow_date={TODAY}", None, 1, 1),
+    ("POST /borrows/batch", "POST", "/api_library/borrows/batch", {"book_ids": [7, 8, 9, 8], "reader_name": "reader", "borrow_date": TODAY}, 1, 4),
+    ("PATCH /borrows/{id}/response", "PATCH", f"/api_library/borrows/1/response?return_date={TODAY}", None, 1, 1),
+    ("PATCH /borrows/return", "PATCH", "/api_library/borrows/return", {"borrow_ids": [4, 5, 7], "return_date": TODAY}, 1, 3),
+    ("DELETE /books/{id}", "DELETE", "/api_library/books/100", None, 1, 1),
+    ("DELETE /authors/{id}", "DELETE", "/api_library/authors/20", None, 1, 1),
+    ("GET /authors/export", "GET", "/api_library/authors/export", None, 1, 20),
+    ("GET /books/export", "GET", "/api_library/books/export", None, 1, 100),
+    ("GET /borrows/export", "GET", "/api_library/borrows/export", None, 1, 300),
+]
+
+
+def returned_items(response) -> int:
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        if "items" not in body:
+            return 1
+        # Failed positions of a batch come back with "item": null.
+        return sum(item.get("item", item) is not None for item in body["items"])
+    # The exports stream one JSON object per line.
+    return response.body.count(b"\n")
+
+
+@pytest.mark.parametrize("method, url, body, budget, items", [route[1:] for route in ROUTES], ids=[route[0] for route in ROUTES])
+async def test_route_stays_within_query_budget(method, url, body, budget, items, client, seed_catalog, max_queries, has_trigram_extension):
+    await seed_catalog()
+    if "/authors/search" in url and not has_trigram_extension:
+        pytest.skip("pg_trgm is not installed")
+
+    with max_queries(budget):
+        response = await client(method, url, body)
+
+    assert response.status < 300, response.body
+    assert returned_items(response) >= items
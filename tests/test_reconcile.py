@@ -0,0 +1,59 @@
+"""Counter reconcile runs as a background job with a status endpoint, one
+pass at a time across workers."""
+import asyncio
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import text  # noqa: E402
+
+from app.crud.maintenance import RECONCILE_LOCK  # noqa: E402
+from app.database import engine  # noqa: E402
+
+
+async def test_reconcile_repairs_counters_in_the_background(client, seed_catalog):
+    await seed_catalog(authors=3, books_per_author=4, borrows_per_book=2)
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE book SET borrows_count = 0 WHERE id <= 5"))
+        await conn.execute(text("UPDATE author SET books_count = 9 WHERE id = 2"))
+
+    response = await client("POST", "/api_library/maintenance/counters/reconcile?batch_size=2")
+
+    assert response.status == 202
+    location = response.headers["location"]
+    assert response.json()["job"]["state"] == "running"
+
+    async with asyncio.timeout(10):
+        while (job := (await client("GET", location)).json())["state"] == "running":
+            await asyncio.sleep(0.01)
+
+    assert job["state"] == "done"
+    assert job["repaired"] == {"author": 1, "book": 5}
+    book = (await client("GET", "/api_library/books/1")).json()
+    assert book["borrows_count"] == 2
+
+
+async def test_unknown_reconcile_job(client):
+    response = await client("GET", "/api_library/maintenance/counters/reconcile/0")
+
+    assert response.status == 404
+
+
+async def test_reconcile_is_skipped_while_another_instance_runs_one(client, seed_catalog):
+    await seed_catalog(authors=1, books_per_author=1, borrows_per_book=0)
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": RECONCILE_LOCK})
+        try:
+            response = await client("POST", "/api_library/maintenance/counters/reconcile")
+            location = response.headers["location"]
+            async with asyncio.timeout(10):
+                while (job := (await client("GET", location)).json())["state"] == "running":
+                    await asyncio.sleep(0.01)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RECONCILE_LOCK})
+
+    assert job["state"] == "skipped"
+    assert job["repaired"] == {"author": None, "book": None}
@@ -0,0 +1,40 @@
+"""Book search: short terms match whole words only, longer ones as prefixes."""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from app.config import SEARCH_PREFIX_MIN_LENGTH  # noqa: E402
+
+
+async def search(client, q: str):
+    return await client("GET", f"/api_library/books/search?q={q}&limit=500")
+
+
+async def test_short_term_is_not_a_prefix(client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=10, borrows_per_book=0)
+
+    assert (await search(client, "title"[:SEARCH_PREFIX_MIN_LENGTH - 1])).status == 404
+    assert len((await search(client, "title"[:SEARCH_PREFIX_MIN_LENGTH])).json()["items"]) == 20
+
+
+async def test_short_term_matches_whole_word(client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=10, borrows_per_book=0)
+
+    response = await search(client, "of")
+
+    assert response.status == 200
+    assert len(response.json()["items"]) == 20
+
+
+async def test_terms_are_combined(client, seed_catalog):
+    await seed_catalog(authors=2, books_per_author=10, borrows_per_book=0)
+
+    response = await search(client, "of title1")
+
+    assert response.status == 200
+    assert sorted(book["title"] for book in response.json()["items"]) == sorted(
+        ["title1"] + [f"title1{digit}" for digit in range(10)]
+    )
@@ -0,0 +1,31 @@
+"""The periodic refresh skips views that another worker refreshed within the
+period."""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy.future import select  # noqa: E402
+
+from app.crud.stats import borrow_summary, refresh_stats  # noqa: E402
+from app.database import async_session  # noqa: E402
+
+
+async def refreshed_at():
+    async with async_session() as db:
+        return (await db.execute(select(borrow_summary.c.refreshed_at))).scalar()
+
+
+async def test_refresh_skips_fresh_views(seed_catalog):
+    await seed_catalog(authors=2, books_per_author=2, borrows_per_book=1)
+    seeded_at = await refreshed_at()
+
+    async with async_session() as db:
+        assert await refresh_stats(db, max_age=3600) is False
+    assert await refreshed_at() == seeded_at
+
+    async with async_session() as db:
+        assert await refresh_stats(db, max_age=0) is True
+    assert await refreshed_at() > seeded_at